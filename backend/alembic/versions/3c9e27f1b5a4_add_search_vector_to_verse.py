@@ -0,0 +1,55 @@
+"""add search_vector to verse
+
+Revision ID: 3c9e27f1b5a4
+Revises: 014873d8d134
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e27f1b5a4'
+down_revision: Union[str, None] = '014873d8d134'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('verse', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ts_config', postgresql.REGCONFIG(), server_default=sa.text("'simple'"), nullable=False))
+
+    # text search configuration of already imported versions, from bible language
+    op.execute(
+        """
+        UPDATE verse SET ts_config = (
+            CASE language.code
+                WHEN 'en' THEN 'english'
+                WHEN 'fr' THEN 'french'
+                WHEN 'de' THEN 'german'
+                WHEN 'el' THEN 'greek'
+                ELSE 'simple'
+            END
+        )::regconfig
+        FROM chapter, book, bible, language
+        WHERE verse.chapter_id = chapter.id
+            AND chapter.book_id = book.id
+            AND book.bible_id = bible.id
+            AND bible.lang_id = language.id
+        """
+    )
+
+    with op.batch_alter_table('verse', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector(ts_config, coalesce(subtitle, '') || ' ' || content)", persisted=True), nullable=True))
+        batch_op.create_index('ix_verse_search_vector', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('verse', schema=None) as batch_op:
+        batch_op.drop_index('ix_verse_search_vector', postgresql_using='gin')
+        batch_op.drop_column('search_vector')
+        batch_op.drop_column('ts_config')
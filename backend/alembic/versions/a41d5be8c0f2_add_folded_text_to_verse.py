@@ -0,0 +1,44 @@
+"""add folded_text to verse
+
+Revision ID: a41d5be8c0f2
+Revises: 3c9e27f1b5a4
+Create Date: 2026-10-18 10:03:17.551920
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41d5be8c0f2'
+down_revision: Union[str, None] = '3c9e27f1b5a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('verse', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('folded_text', sa.Text(), nullable=True))
+
+    # existing verses are filled by the importer (prestart.sh), see fold_verses
+    bind = op.get_bind()
+    has_trgm = bind.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).scalar()
+    if has_trgm:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        with op.batch_alter_table('verse', schema=None) as batch_op:
+            batch_op.create_index('ix_verse_folded_text', ['folded_text'], unique=False, postgresql_using='gin', postgresql_ops={'folded_text': 'gin_trgm_ops'})
+    else:
+        logger.warning("pg_trgm extension not available, ix_verse_folded_text not created")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_verse_folded_text', table_name='verse', if_exists=True)
+    with op.batch_alter_table('verse', schema=None) as batch_op:
+        batch_op.drop_column('folded_text')
@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.index.base import registries
+from app.index.versions import version_registry
+
+logger = logging.getLogger(__name__)
+
+# query params holding version names, compared upper cased
+VERSION_PARAMS = ("version", "translate_versions")
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    body: bytes
+    headers: dict
+
+    def to_response(self) -> Response:
+        if self.status_code != 200:
+            raise HTTPException(
+                status_code=self.status_code,
+                detail=self.body.decode(),
+                headers=self.headers or None,
+            )
+        return Response(content=self.body, headers={**self.headers, "X-Cache": "HIT"})
+
+
+class ResponseCache:
+    """Process wide LRU cache of responses, entries expire after `ttl` seconds
+
+    Cleared with other indexes when a bible is imported or deleted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        registries.append(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: CachedResponse, ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bible_id: Optional[int] = None):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL
+)
+
+
+def cached(endpoint: Callable) -> Callable:
+    """Mark a route endpoint as cacheable by `CachedRoute`"""
+    endpoint.response_cache = True
+    return endpoint
+
+
+def cache_key(path: str, request: Request) -> Optional[tuple]:
+    """Route path plus normalized path and query params, and the fingerprint
+    (bible id, content hash) of each version, so a version updated in place,
+    by another process too, gets a new key
+
+    None while the version registry must be loaded again to tell fingerprints.
+    """
+    path_params = tuple(
+        sorted(
+            (k, v.upper() if k in VERSION_PARAMS else v)
+            for k, v in request.path_params.items()
+        )
+    )
+    query_params = []
+    for k, v in request.query_params.multi_items():
+        if k in VERSION_PARAMS:
+            query_params.extend((k, x.upper()) for x in v.split(",") if x)
+        else:
+            query_params.append((k, v))
+    # stable sort, order of translate_versions is kept
+    query_params.sort(key=lambda item: item[0])
+    versions = [v for k, v in path_params + tuple(query_params) if k in VERSION_PARAMS]
+    if versions and not version_registry.fresh():
+        return None
+    fingerprints = []
+    for version in versions:
+        info = version_registry.peek(version)
+        fingerprints.append((info.id, info.content_hash) if info else None)
+    return path, path_params, tuple(query_params), tuple(fingerprints)
+
+
+def _bypass(request: Request) -> bool:
+    """Conditional requests are answered by `check_not_modified`, and clients
+    can ask for a fresh response"""
+    headers = request.headers
+    return (
+        "if-none-match" in headers
+        or "if-modified-since" in headers
+        or "no-cache" in headers.get("cache-control", "")
+    )
+
+
+class CachedRoute(APIRoute):
+    """Route serving responses of `cached` endpoints from `response_cache`
+
+    Cache is looked up before dependencies are solved, so a hit does not open
+    any db session. Not found errors are cached too, until versions are
+    reloaded. The cache is skipped while the version registry is expired, the
+    endpoint loads it again.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not getattr(self.endpoint, "response_cache", False):
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            if response_cache.maxsize <= 0:
+                return await handler(request)
+            key = cache_key(self.path, request)
+            if key is not None and not _bypass(request):
+                entry = response_cache.get(key)
+                if entry is not None:
+                    return entry.to_response()
+
+            try:
+                response = await handler(request)
+            except HTTPException as exc:
+                key = cache_key(self.path, request)  # versions loaded by now
+                if exc.status_code == 404 and key is not None:
+                    response_cache.set(
+                        key,
+                        CachedResponse(404, str(exc.detail).encode(), exc.headers),
+                        ttl=version_registry.reload_interval,
+                    )
+                raise
+
+            key = cache_key(self.path, request)
+            body = getattr(response, "body", None)  # not for streamed responses
+            if response.status_code == 200 and body is not None and key is not None:
+                # validators set by check_not_modified
+                headers = dict(response.headers)
+                headers.update(getattr(request.state, "cache_headers", None) or {})
+                response_cache.set(key, CachedResponse(200, body, headers))
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return cached_handler
@@ -1,6 +1,18 @@
-from typing import Generator
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncGenerator, Generator, List, Optional
 
-from app.db.session import SessionLocal
+from fastapi import HTTPException, Query, Request
+
+from app.core.config import settings
+from app.db.session import (
+    AsyncSessionLocal,
+    SessionLocal,
+    async_read_session,
+    read_session,
+)
+from app.index import version_registry
 
 
 def get_db() -> Generator:
@@ -11,3 +23,76 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator:
+    """Session of async routes, their queries don't hold a worker thread"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db() -> Generator:
+    """Session of read only routes, on a read replica when there are some"""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db() -> AsyncGenerator:
+    async with await async_read_session() as db:
+        yield db
+
+
+def check_not_modified(
+    request: Request, version: str, translate_versions: List[str] = Query(None)
+):
+    """HTTP validators of bible content, from fingerprints of requested versions
+
+    Conditional requests on unchanged content get a 304 here, before any db
+    session is opened. Otherwise validators are kept in request state, to be
+    added to the response by `add_cache_headers` middleware.
+    """
+    versions = [version] + [
+        v for tv in translate_versions or [] for v in tv.split(",") if v
+    ]
+    infos = [version_registry.peek(v) for v in versions]
+    if not all(info and info.content_hash for info in infos):
+        return  # registry not loaded yet, or version not fingerprinted
+
+    infos = sorted({info.id: info for info in infos}.values())
+    tag = " ".join(f"{info.id}:{info.content_hash}" for info in infos)
+    etag = '"%s"' % hashlib.sha256(tag.encode()).hexdigest()[:32]
+    dates = [info.imported_at for info in infos if info.imported_at]
+    last_modified = max(dates) if dates else None
+
+    headers = {"ETag": etag}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    if settings.HTTP_CACHE_CONTROL:
+        headers["Cache-Control"] = settings.HTTP_CACHE_CONTROL
+
+    if _not_modified(request, etag, last_modified):
+        raise HTTPException(status_code=304, headers=headers)
+    request.state.cache_headers = headers
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
@@ -1,24 +1,52 @@
 import http
 import logging
 import os
-import pathlib
 import urllib.parse
+from collections import defaultdict
 from typing import Annotated, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
-from fastapi.templating import Jinja2Templates
 from ordered_set import OrderedSet
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import and_, or_
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy.sql import func, or_
 from starlette.responses import RedirectResponse
 
 from app import crud
 from app.api import deps
-from app.api.routers.utils import parse_bible_ref, set_query_parameter
+from app.api.cache import CachedRoute, cached, response_cache
+from app.api.routers.utils import decode_cursor, encode_cursor, set_query_parameter
+from app.api.templating import fragment_cache, stream_template
 from app.core.config import settings
-from app.models.bible import Bible, Book, BookTypeEnum, Chapter, Theme, Verse
+from app.db.pool import pool_stats
+from app.db.session import async_engine, engine, read_replicas, read_session
+from app.index import (
+    book_resolver,
+    invalidate_indexes,
+    text_index,
+    theme_tree,
+    verse_map,
+    version_registry,
+)
+from app.index.references import (
+    merge_intervals,
+    parse_bible_ref,
+    split_verses,
+    verse_intervals,
+)
+from app.index.text import ORDER_RANK, ORDER_RELEVANCE, normalize_text
+from app.models.bible import (
+    Bible,
+    Book,
+    BookTypeEnum,
+    Chapter,
+    ThemeInterval,
+    ThemeReference,
+    Verse,
+)
 from app.schemas.bible import (
     BibleItem,
     BookItemShort,
@@ -26,24 +54,29 @@ from app.schemas.bible import (
     ChapterItemNoVerses,
     ListItems,
     ThemeItem,
+    ThemeTreeItem,
     VerseItem,
     VerseItems,
     VerseReferences,
+    dump_json,
 )
 
 logger = logging.getLogger(__name__)
 header_scheme = APIKeyHeader(name="api-key")
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
 
-BASE_PATH = pathlib.Path(__file__).resolve().parent.parent.parent
-TEMPLATES = Jinja2Templates(directory=str(BASE_PATH / "templates"))
+SEARCH_MODE_TEXT = "text"
+SEARCH_MODE_FULLTEXT = "fulltext"
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 1000
 
 
 @router.get("/search/", status_code=200, response_model=ListItems[BibleItem])
 def search_bibles(
     *,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     lang: Optional[str] = None,
     version: Optional[str] = None,
     offset: Annotated[int, Query(ge=0)] = 0,
@@ -69,8 +102,12 @@ def search_bibles(
 
 
 @router.get(
-    "/{version}/books/", status_code=200, response_model=ListItems[BookItemShort]
+    "/{version}/books/",
+    status_code=200,
+    response_model=ListItems[BookItemShort],
+    dependencies=[Depends(deps.check_not_modified)],
 )
+@cached
 def search_books(
     *,
     version: str,
@@ -86,7 +123,7 @@ def search_books(
     code: Optional[str] = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     max_results: Annotated[int, Query(ge=1, le=100)] = 100,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
 ) -> dict:
     """
     Search for book(s) in specific bible
@@ -101,11 +138,13 @@ def search_books(
 
     q = crud.book.get_items(
         db,
-        version,
+        version_registry.bible_id(db, version),
         filters=filters,
         ordering=Book.rank,
     )
-    results = list(q.offset(offset).limit(max_results).all())
+    results = list(
+        q.options(undefer(Book.chapter_count)).offset(offset).limit(max_results).all()
+    )
     return {
         "results": results,
         "total": q.count(),
@@ -118,35 +157,57 @@ def search_books(
     "/{version}/{book_code}/chapters",
     status_code=200,
     response_model=ListItems[ChapterItemNoVerses],
+    dependencies=[Depends(deps.check_not_modified)],
 )
+@cached
 def view_book_chapters(
     *,
     version: str,
     book_code: str,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
 ):
     q = crud.chapter.get_items(
-        db, version, filters=[Book.code == book_code], ordering=Chapter.rank
+        db,
+        version_registry.bible_id(db, version),
+        filters=[Book.code == book_code],
+        ordering=Chapter.rank,
     )
     count = q.count()
-    return {"results": q.all(), "offset": 0, "count": count, "total": count}
+    return {
+        "results": q.options(undefer(Chapter.verse_count)).all(),
+        "offset": 0,
+        "count": count,
+        "total": count,
+    }
 
 
 @router.get(
     "/{version}/chapters/{chapter_code}",
     status_code=200,
     response_model=ChapterItem,
+    dependencies=[Depends(deps.check_not_modified)],
 )
+@cached
 def get_chapter(
     *,
     version: str,
     chapter_code: str,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
 ):
     """Get one chapter with all its verses"""
 
-    q = crud.chapter.get_items(db, version, filters=[Chapter.code == chapter_code])
-    chapter = q.first()
+    bible_id = version_registry.bible_id(db, version)
+    chapter = None
+    if bible_id:
+        payload = crud.chapter.get_payload(db, bible_id, chapter_code)
+        if payload:
+            # rendered at import, header without its closing brace then verses
+            return Response(
+                content=payload.header[:-1] + b',"verses":' + payload.verses + b"}",
+                media_type="application/json",
+            )
+        q = crud.chapter.get_items(db, bible_id, filters=[Chapter.code == chapter_code])
+        chapter = q.first()
     if chapter:
         return chapter
     raise HTTPException(status_code=404, detail="Chapter not found")
@@ -156,6 +217,7 @@ def get_chapter(
     "/{version}/verses/{from_book}",  # /{from_chapter}/{from_verse}
     status_code=200,
     response_model=VerseItems,
+    dependencies=[Depends(deps.check_not_modified)],
 )
 async def search_verses(
     *,
@@ -170,30 +232,30 @@ async def search_verses(
     mix_trans: bool = False,
     offset: Annotated[int, Query(ge=0)] = 0,
     max_results: Annotated[int, Query(ge=1, le=100)] = 100,
+    cursor: Optional[str] = None,
     to_html: bool = False,
     request: Request,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_read_db),
 ) -> dict:
-    """Load on verse or multiple verses across chapters"""
+    """Load on verse or multiple verses across chapters<br/>
+    Pages are read with <i>offset</i>, or faster with the <i>cursor</i> given as
+    <i>next_cursor</i> by the previous page
+    """
+    position = _decode_cursor(cursor)
 
-    main_version, tv = _clean_versions(version, translate_versions, db)
+    main_version, tv = await _clean_versions(version, translate_versions, db)
+    bible_ids = await version_registry.aids(db, tv)
+    main_id = bible_ids.get(main_version)
+    resolver = await book_resolver.aget(db, main_id) if main_id else None
 
-    start_book = (
-        crud.book.query_by_name_or_code(db, main_version, from_book).first()
-        if from_book
-        else None
-    )
+    start_book = resolver.resolve(from_book) if resolver else None
     f_book = start_book.rank if start_book else -1
 
-    t_book = -1
-    if to_book is None:
-        to_book = from_book
-        t_book = f_book
-
-    dest_book = crud.book.query_by_name_or_code(db, main_version, to_book).first()
-
-    if not to_book == from_book:
-        t_book = dest_book.rank if dest_book else -1
+    if to_book is None or to_book == from_book:
+        dest_book = start_book
+    else:
+        dest_book = resolver.resolve(to_book) if resolver else None
+    t_book = dest_book.rank if dest_book else -1
 
     if t_book < f_book:
         raise HTTPException(
@@ -202,14 +264,14 @@ async def search_verses(
         )
 
     if to_chapter is None:
-        if from_chapter is None:
-            from_chapter = 1
-            to_chapter = max([c.rank for c in dest_book.chapters])
+        if from_chapter is not None and f_book == t_book:
+            to_chapter = from_chapter
+        elif dest_book:
+            to_chapter = (await verse_map.aget(db, main_id)).last_chapter(t_book)
         else:
-            if f_book == t_book:
-                to_chapter = from_chapter
-            else:
-                to_chapter = max([c.rank for c in dest_book.chapters])
+            raise HTTPException(status_code=404, detail="Book not found")
+    if from_chapter is None:
+        from_chapter = 1
 
     if f_book == t_book and to_chapter < from_chapter:
         raise HTTPException(
@@ -220,48 +282,65 @@ async def search_verses(
     results = []
     trans = []
     total = 0
-    for vers in tv:
-        qf = crud.verse.query_by_version(db, vers)
+    main_bounds = None
+    next_cursor = None
+    if main_id:
+        vmap = await verse_map.aget(db, main_id)
 
-        start_verse = qf.filter(
-            and_(
-                Book.rank == f_book,
-                Chapter.rank == from_chapter,
-                Verse.rank == from_verse,
-            )
-        ).first()
+        start = vmap.find(f_book, from_chapter, from_verse)
         if to_verse is not None and to_verse > 0:
-            end_verse = qf.filter(
-                and_(
-                    Book.rank == t_book,
-                    Chapter.rank == to_chapter,
-                    Verse.rank == to_verse,
-                )
-            ).first()
+            end = vmap.find(t_book, to_chapter, to_verse)
         else:
-            qf = qf.filter(Book.rank == t_book)
-            if to_chapter is not None and to_chapter > 0:
-                qf = qf.filter(Chapter.rank == to_chapter)
-            end_verse = qf.order_by(Verse.rank_all.desc()).first()
-
-        if start_verse and end_verse:
-            logger.info("start_verse : %s - end_verse: %s", start_verse, end_verse)
-            base_q = crud.verse.query_by_version(db, vers)
-            q = base_q.filter(
-                Verse.rank_all >= start_verse.rank_all,
-                Verse.rank_all <= end_verse.rank_all,
-            )
-            res = q.order_by(Verse.rank_all).offset(offset).limit(max_results).all()
-            if mix_trans or vers == main_version:
-                results.extend(res)
-                total = max(
-                    total, q.count()
-                )  # number of verses may differ per translation
+            end = vmap.last_verse(t_book, to_chapter)
+
+        if start and end:
+            logger.info("%s start: %s - end: %s", main_version, start, end)
+            if (
+                len(bible_ids) == 1
+                and not to_html
+                and not position
+                and offset == 0
+                and vmap.count(start, end) <= max_results
+            ):
+                response = await _chapter_verses(db, main_id, vmap, start, end)
+                if response:
+                    return response
+
+            if "after" in position:
+                # keyset pagination, a range scan whatever the page depth
+                first, skip = max(start, position["after"] + 1), 0
             else:
-                trans.append({"version": vers, "verses": res})
-
+                first, skip = start, offset
+            results = await crud.verse.aget_items(
+                db,
+                main_id,
+                filters=[Verse.rank_all.between(first, end)],
+                ordering=Verse.rank_all,
+                offset=skip,
+                limit=max_results,
+            )
+            total = vmap.count(start, end)
+            main_bounds = (vmap.previous(start), vmap.next(end))
+            if results:
+                following = vmap.next(results[-1].rank_all)
+                if following is not None and following <= end:
+                    next_cursor = encode_cursor(after=results[-1].rank_all)
+
+    aligned = await _translations(db, results, bible_ids, main_version)
     if mix_trans:
-        results.sort(key=lambda x: (x.book_rank, x.chapter_rank, x.rank))
+        # each verse followed by its translations
+        results = [
+            v
+            for verse in results
+            for v in [verse]
+            + [t for by_source in aligned.values() for t in by_source[verse.id]]
+        ]
+    else:
+        trans = [
+            {"version": vers, "verses": _aligned_list(results, verses)}
+            for vers, verses in aligned.items()
+            if verses
+        ]
 
     data = {
         "results": results,
@@ -269,6 +348,7 @@ async def search_verses(
         "offset": offset,
         "total": total,
         "trans": trans,
+        "next_cursor": next_cursor,
         "more_url": set_query_parameter(
             str(request.url),
             new_param_values={"offset": offset + max_results},
@@ -282,29 +362,105 @@ async def search_verses(
         if offset > 0
         else None,
     }
-
-    if results:
+    if cursor:
         data.update(
             {
-                "previous": base_q.filter(
-                    Verse.rank_all == start_verse.rank_all - 1
-                ).first(),
-                "next": base_q.filter(Verse.rank_all == end_verse.rank_all + 1).first(),
+                "more_url": (
+                    set_query_parameter(
+                        str(request.url),
+                        new_param_values={"cursor": next_cursor, "offset": None},
+                    )
+                    if next_cursor
+                    else None
+                ),
+                "less_url": None,
             }
         )
 
+    if results and main_bounds:
+        previous, next_ = main_bounds
+        around = await _verses_at(db, main_id, main_bounds)
+        data.update({"previous": around.get(previous), "next": around.get(next_)})
+
     if to_html:
         data.update({"request": request})
-        return TEMPLATES.TemplateResponse("verse.html", data)
+        return stream_template("verse.html", data)
     else:
         return data
 
 
+@router.get(
+    "/{version}/stream",
+    status_code=200,
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    dependencies=[Depends(deps.check_not_modified)],
+)
+def stream_verses(
+    *,
+    version: str,
+    from_book: Optional[str] = None,
+    to_book: Optional[str] = None,
+    db: Session = Depends(deps.get_read_db),
+):
+    """Stream all verses of a version, or of a range of books, as newline
+    delimited JSON (one verse per line), without paging
+    """
+    bible_id = version_registry.bible_id(db, version)
+    if not bible_id:
+        raise HTTPException(
+            status_code=404, detail=f"Bible version {version} not found"
+        )
+    vmap = verse_map.get(db, bible_id)
+    resolver = book_resolver.get(db, bible_id)
+
+    bounds = []
+    for identifier, default in ((from_book, min), (to_book, max)):
+        if identifier:
+            book = resolver.resolve(identifier)
+            if not book or book.rank not in vmap.book_bounds:
+                raise HTTPException(status_code=404, detail="Book not found")
+            bounds.append(book.rank)
+        else:
+            bounds.append(default(vmap.book_bounds, default=None))
+    if bounds[0] is None:
+        return StreamingResponse(iter([]), media_type=NDJSON_MEDIA_TYPE)
+    if bounds[1] < bounds[0]:
+        raise HTTPException(
+            status_code=400,
+            detail="<to_book> param should be greater than <from_book>",
+        )
+    start = vmap.book_bounds[bounds[0]][0]
+    end = vmap.book_bounds[bounds[1]][1]
+    return StreamingResponse(
+        _stream_verses(bible_id, start, end), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+def _stream_verses(bible_id: int, start: int, end: int):
+    """Verses read with a server side cursor, in their own session as the
+    request one is closed before the response is sent"""
+    db = read_session()
+    try:
+        q = (
+            crud.verse.query_by_bible(db, bible_id)
+            .filter(Verse.rank_all.between(start, end))
+            .order_by(Verse.rank_all)
+            .yield_per(STREAM_BATCH_SIZE)
+        )
+        for verse in q:
+            yield VerseItem.model_validate(verse).model_dump_json() + "\n"
+    finally:
+        db.close()
+
+
 @router.get(
     "/{version}/verses_ref",
     status_code=200,
     response_model=VerseReferences,
+    dependencies=[Depends(deps.check_not_modified)],
 )
+@cached
 async def search_references(
     *,
     version: str,
@@ -312,7 +468,7 @@ async def search_references(
     translate_versions: List[str] = Query([]),
     to_html: bool = False,
     request: Request,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_read_db),
 ) -> dict:
     """Search one or multiple references using common format:<br/>
     (Book identifier can be name or short_name or code)
@@ -324,79 +480,115 @@ async def search_references(
 
     """
     refs = parse_bible_ref(references)
-    main_version, tv = _clean_versions(version, translate_versions, db)
+    main_version, tv = await _clean_versions(version, translate_versions, db)
+    bible_ids = await version_registry.aids(db, tv)
+    main_id = bible_ids.get(main_version)
+    if not main_id:
+        refs = []
+    else:
+        vmap = await verse_map.aget(db, main_id)
+        resolver = await book_resolver.aget(db, main_id)
+
+    # resolve all references to rank_all intervals first
     results = dict()
-    for vers in tv:
-        book_q = crud.book.query_by_version(db, vers)
-        for ref in refs:
-            q = crud.verse.query_by_version(db, vers)
-            book_name = ref["book"]
-            chapter_rank = ref["chapter"]
-            if vers == main_version:
-                book = book_q.filter(
-                    or_(
-                        Book.name.ilike(book_name),
-                        Book.short_name.ilike(book_name),
-                        Book.code.ilike(book_name),
-                    )
-                ).first()
-                ref["book_code"] = book.code if book else "-1"
+    for ref in refs:
+        book_name = ref["book"]
+        chapter_rank = ref["chapter"]
+        book = resolver.resolve(book_name)
+
+        verse_range = ref["verses"] if ref["verses"] else [None]  # whole chapter
+        for verse in verse_range:
+            if verse is None:
+                location = f"{chapter_rank}"
             else:
-                book = book_q.filter(Book.code == ref.get("book_code", "-1")).first()
-
-            q = q.filter(Chapter.rank == chapter_rank, Chapter.book == book)
-
-            verse_range = (
-                ref["verses"] if ref["verses"] else ["1-300"]
-            )  # hack for all verses in a chapter (e.g Mat 10;Pro 5)
-            if verse_range:
-                for verse in verse_range:
-                    interval = verse.split("-")
-                    if len(interval) == 1:
-                        qv = q.filter(Verse.rank == interval[0].strip())
-                    else:
-                        qv = q.filter(
-                            Verse.rank >= interval[0].strip(),
-                            Verse.rank <= interval[1].strip(),
-                        )
-                    if verse == "1-300":
-                        reference = f"{book.name if book else book_name} {chapter_rank}"
-                        key = f"{book.code if book else book_name} {chapter_rank}"
-                        verses = q.all()
-                    else:
-                        reference = (
-                            f"{book.name if book else book_name} {chapter_rank}:{verse}"
-                        )
-                        key = (
-                            f"{book.code if book else book_name} {chapter_rank}:{verse}"
-                        )
-                        verses = qv.all()
-
-                    item = {
-                        "version": vers,
-                        "reference": reference,
-                        "verses": verses,
-                    }
-
-                    if vers == main_version:
-                        item.update({"trans": []})
-                        results[key] = item
-                    else:
-                        if key in results:
-                            results[key]["trans"].append(item)
+                location = f"{chapter_rank}:{verse}"
+            _add_reference(
+                results,
+                main_version,
+                book,
+                book_name,
+                location,
+                (verse_intervals(vmap, book.rank, chapter_rank, verse) if book else []),
+            )
+
+    await _load_references(db, results, main_id, main_version, bible_ids)
 
     data = {"results": results.values(), "versions": tv}
     if to_html:
         data.update({"request": request})
-        return TEMPLATES.TemplateResponse("references.html", data)
+        return stream_template("references.html", data)
     else:
         return data
 
 
+def _add_reference(
+    results: dict, version: str, book, book_name: str, location: str, intervals
+):
+    """Reference item keyed by book code and location, `book` (with code and
+    name in the version) is None if not found"""
+    key = f"{book.code if book else book_name} {location}"
+    results[key] = {
+        "version": version,
+        "reference": f"{book.name if book else book_name} {location}",
+        "book_code": book.code if book else None,
+        "book_name": book_name,
+        "location": location,
+        "intervals": intervals,
+        "trans": [],
+    }
+
+
+async def _load_references(
+    db: AsyncSession, results: dict, main_id: int, main_version: str, bible_ids: dict
+):
+    """Verses and translations of references resolved to rank_all intervals,
+    items of `results` are completed in place"""
+    # verses of all references loaded at once
+    intervals = merge_intervals(
+        [i for item in results.values() for i in item["intervals"]]
+    )
+    verses = []
+    if intervals:
+        verses = await crud.verse.aget_items(
+            db,
+            main_id,
+            filters=[or_(*[Verse.rank_all.between(f, t) for f, t in intervals])],
+            ordering=Verse.rank_all,
+        )
+    for item in results.values():
+        item["verses"] = split_verses(verses, item.pop("intervals"))
+
+    all_verses = [v for item in results.values() for v in item["verses"]]
+    aligned = await _translations(db, all_verses, bible_ids, main_version)
+    book_names = {
+        (bible_id, code): name
+        for bible_id, code, name in await db.execute(
+            select(Book.bible_id, Book.code, Book.name).where(
+                Book.bible_id.in_(bible_ids.values()),
+                Book.code.in_({item["book_code"] for item in results.values()}),
+            )
+        )
+    }
+    for item in results.values():
+        book_code = item.pop("book_code")
+        book_name = item.pop("book_name")
+        location = item.pop("location")
+        for vers, by_source in aligned.items():
+            name = book_names.get((bible_ids[vers], book_code), book_name)
+            item["trans"].append(
+                {
+                    "version": vers,
+                    "reference": f"{name} {location}",
+                    "verses": _aligned_list(item["verses"], by_source),
+                }
+            )
+
+
 @router.get(
     "/{version}/search",
     status_code=200,
     response_model=VerseItems,
+    dependencies=[Depends(deps.check_not_modified)],
 )
 async def search_text(
     *,
@@ -405,64 +597,189 @@ async def search_text(
     book: Optional[str] = None,
     book_chapter: Optional[int] = None,
     translate_versions: List[str] = Query(None),
+    mode: Optional[str] = Query(
+        SEARCH_MODE_TEXT, enum=[SEARCH_MODE_TEXT, SEARCH_MODE_FULLTEXT]
+    ),
+    order: Optional[str] = Query(ORDER_RANK, enum=[ORDER_RANK, ORDER_RELEVANCE]),
     offset: Annotated[int, Query(ge=0)] = 0,
     max_results: Annotated[int, Query(ge=1, le=100)] = 100,
-    db: Session = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    db: AsyncSession = Depends(deps.get_async_read_db),
 ):
-    """Search for text in verses"""
-
-    main_version, trv = _clean_versions(version, translate_versions, db)
-
-    q = crud.verse.query_by_version(db, main_version)
-
-    filters = []
-    for t in text:
-        filters.append(or_(Verse.content.icontains(t), Verse.subtitle.icontains(t)))
-    q = q.filter(or_(*filters))
-
-    if book:
-        bk = crud.book.query_by_name_or_code(db, main_version, book).first()
-        if bk:
-            chapters = db.query(Chapter).filter(Chapter.book == bk).all()
-            if book_chapter:
-                q = q.filter(Chapter.rank == book_chapter)
-
-            # this has far better perf then joining with filtering Book directly in main query
-            q = q.filter(Verse.chapter_id.in_([c.id for c in chapters]))
-
-    results = list(q.order_by(Verse.rank_all).offset(offset).limit(max_results).all())
+    """Search for text in verses<br/>
+    <ul>
+    <li><i>mode=text</i> : verses containing one of the given texts, case and
+    accents are ignored
+    <li><i>mode=fulltext</i> : language aware word search (stemming, stop
+    words), each text supports web search syntax e.g <i>"love one another" -hate</i>
+    </ul>
+    Results are sorted by position in bible, or by relevance with
+    <i>order=relevance</i>.<br/>
+    Following pages are read with <i>offset</i>, or faster with the
+    <i>cursor</i> given as <i>next_cursor</i>. Counting all results can be
+    skipped with <i>with_total=false</i>
+    """
+    position = _decode_cursor(cursor)
+    if cursor:
+        offset = position.get("offset", 0)
+
+    main_version, trv = await _clean_versions(version, translate_versions, db)
+    main_id = await version_registry.abible_id(db, main_version)
+
+    if not main_id:
+        results, total, next_cursor = [], 0, None
+    elif mode == SEARCH_MODE_TEXT and settings.SEARCH_INDEX_ENABLED:
+        results, total, next_cursor = await _search_text_index(
+            db, main_id, text, book, book_chapter, order, offset, max_results
+        )
+    else:
+        results, total, next_cursor = await _search_text_db(
+            db,
+            main_id,
+            text,
+            book,
+            book_chapter,
+            offset,
+            max_results,
+            fulltext=mode == SEARCH_MODE_FULLTEXT,
+            order=order,
+            after=position.get("after"),
+            with_total=with_total,
+        )
 
     trans = []
-    if results and trv:
-        verse_codes = [verse.code for verse in results]
-        for tv in trv:
-            if tv != main_version:
-                verses = (
-                    crud.verse.query_by_version(db, tv)
-                    .filter(Verse.code.in_(verse_codes))
-                    .order_by(Verse.rank_all)
-                    .all()
-                )
-
-                trans.append({"version": tv, "verses": verses})
+    if results:
+        bible_ids = await version_registry.aids(db, trv)
+        aligned = await _translations(db, results, bible_ids, main_version)
+        trans = [
+            {"version": vers, "verses": _aligned_list(results, verses)}
+            for vers, verses in aligned.items()
+        ]
 
     return {
         "results": results,
         "offset": offset,
         "count": len(results),
-        "total": q.count(),
+        "total": total,
         "trans": trans,
+        "next_cursor": next_cursor,
     }
 
 
+async def _search_text_index(
+    db: AsyncSession,
+    bible_id: int,
+    text: List[str],
+    book: Optional[str],
+    book_chapter: Optional[int],
+    order: str,
+    offset: int,
+    max_results: int,
+):
+    """Text search served by in memory index, only the page is read from db"""
+    book_rank = chapter_rank = None
+    if book:
+        bk = (await book_resolver.aget(db, bible_id)).resolve(book)
+        if bk:
+            book_rank = bk.rank
+            chapter_rank = book_chapter
+
+    index = await text_index.aget(db, bible_id)
+    ids = index.search(text, book_rank, chapter_rank, order)
+    page = ids[offset : offset + max_results]
+    verses = {
+        v.id: v
+        for v in await crud.verse.aget_items(db, bible_id, filters=[Verse.id.in_(page)])
+    }
+    next_offset = offset + max_results
+    next_cursor = encode_cursor(offset=next_offset) if next_offset < len(ids) else None
+    return [verses[i] for i in page if i in verses], len(ids), next_cursor
+
+
+async def _search_text_db(
+    db: AsyncSession,
+    bible_id: int,
+    text: List[str],
+    book: Optional[str],
+    book_chapter: Optional[int],
+    offset: int,
+    max_results: int,
+    fulltext: bool = False,
+    order: str = ORDER_RANK,
+    after: Optional[int] = None,
+    with_total: bool = True,
+):
+    """Text search in db, scanning verse table or using postgres full text
+    search index when `fulltext` is set
+
+    Pages sorted by rank start `after` a rank_all when given (keyset
+    pagination), others use offset.
+    """
+    q = crud.verse.select_by_bible(bible_id)
+
+    ordering = [Verse.rank_all]
+    if fulltext:
+        # config of each verse, as in its search_vector ('simple' by default)
+        ts_query = None
+        for t in text:
+            tq = func.websearch_to_tsquery(Verse.ts_config, t)
+            ts_query = tq if ts_query is None else ts_query.op("||")(tq)
+        q = q.where(Verse.search_vector.op("@@")(ts_query))
+        if order == ORDER_RELEVANCE:
+            ordering.insert(0, func.ts_rank(Verse.search_vector, ts_query).desc())
+    else:
+        filters = []
+        for t in text:
+            filters.append(
+                Verse.folded_text.contains(normalize_text(t), autoescape=True)
+            )
+        q = q.where(or_(*filters))
+
+    if book:
+        bk = (await book_resolver.aget(db, bible_id)).resolve(book)
+        if bk:
+            chapter_ids = await db.scalars(
+                select(Chapter.id).where(Chapter.book_id == bk.id)
+            )
+            if book_chapter:
+                q = q.where(Chapter.rank == book_chapter)
+
+            # this has far better perf then joining with filtering Book directly in main query
+            q = q.where(Verse.chapter_id.in_(chapter_ids.all()))
+
+    total = None
+    if with_total:
+        total = await db.scalar(select(func.count()).select_from(q.subquery()))
+    keyset = len(ordering) == 1
+    if keyset and after is not None:
+        q = q.where(Verse.rank_all > after)
+    elif offset:
+        q = q.offset(offset)
+    # one more row tells if there is a following page
+    results = list(await db.scalars(q.order_by(*ordering).limit(max_results + 1)))
+
+    next_cursor = None
+    if len(results) > max_results:
+        results = results[:max_results]
+        if keyset:
+            next_cursor = encode_cursor(after=results[-1].rank_all)
+        else:
+            next_cursor = encode_cursor(offset=offset + max_results)
+    return results, total, next_cursor
+
+
 @router.delete("/delete/id/{bid}")
 async def delete_bible_by_id(
-    bid: int, db: Session = Depends(deps.get_db), key: str = Depends(header_scheme)
+    bid: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    key: str = Depends(header_scheme),
 ):
     """Delete bible by id"""
     try:
         if key == settings.SECRET_API_KEY:
-            crud.bible.delete_by_id(db, bid)
+            await crud.bible.adelete_by_id(db, bid)
+            invalidate_indexes(bid)
             return {"msg": "Successfully deleted."}
         else:
             raise HTTPException(status_code=403, detail="Bad key supplied")
@@ -472,13 +789,16 @@ async def delete_bible_by_id(
 
 @router.delete("/delete/version/{version}")
 async def delete_bible_by_version(
-    version: str, db: Session = Depends(deps.get_db), key: str = Depends(header_scheme)
+    version: str,
+    db: AsyncSession = Depends(deps.get_async_db),
+    key: str = Depends(header_scheme),
 ):
     """Delete bible by version name"""
     if key == settings.SECRET_API_KEY:
-        bible = crud.bible.query_by_version(db, version).first()
-        if bible:
-            crud.bible.delete_by_id(db, bible.id)
+        bible_id = await version_registry.abible_id(db, version)
+        if bible_id:
+            await crud.bible.adelete_by_id(db, bible_id)
+            invalidate_indexes(bible_id)
             return {"msg": "Successfully deleted."}
         else:
             raise HTTPException(
@@ -488,14 +808,62 @@ async def delete_bible_by_version(
         raise HTTPException(status_code=403, detail="Bad key supplied")
 
 
+@router.get("/cache/stats", status_code=200)
+def cache_stats() -> dict:
+    """Hit and miss counters of the response cache, and of html fragments"""
+    return {**response_cache.stats(), "fragments": fragment_cache.stats()}
+
+
+@router.get("/pool/stats", status_code=200)
+def db_pool_stats() -> dict:
+    """Connections in use, overflow and checkout wait of this worker db pools"""
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine.sync_engine),
+        "replicas": read_replicas.stats(),
+    }
+
+
 @router.get(
     "/themes/list",
     status_code=200,
     response_model=ListItems[ThemeItem],
 )
-def list_themes(db: Session = Depends(deps.get_db)):  # add lang param
-    themes = db.query(Theme).order_by(Theme.id, Theme.parent_id).all()
-    return {"results": list(themes), "count": len(themes), "total": len(themes)}
+def list_themes(lang: Optional[str] = None, db: Session = Depends(deps.get_read_db)):
+    """All themes by id, those of a language (and those shared by all
+    languages) if `lang` is set"""
+    themes = sorted(
+        (node for node in theme_tree.get(db).values() if node.in_lang(lang)),
+        key=lambda node: node.id,
+    )
+    return {"results": themes, "count": len(themes), "total": len(themes)}
+
+
+@router.get(
+    "/themes/tree",
+    status_code=200,
+    response_model=ListItems[ThemeTreeItem],
+)
+def get_theme_tree(lang: Optional[str] = None, db: Session = Depends(deps.get_read_db)):
+    """Root themes with their sub-themes, filtered by language as in
+    `list_themes`"""
+    roots = theme_tree.roots(db, lang)
+    return {
+        "results": [_theme_subtree(node, lang) for node in roots],
+        "count": len(roots),
+        "total": len(roots),
+    }
+
+
+def _theme_subtree(node, lang: Optional[str]) -> dict:
+    return {
+        **node._asdict(),
+        "children": [
+            _theme_subtree(child, lang)
+            for child in node.children
+            if child.in_lang(lang)
+        ],
+    }
 
 
 @router.get(
@@ -507,6 +875,7 @@ def list_themes(db: Session = Depends(deps.get_db)):  # add lang param
     status_code=200,
     response_model=VerseReferences,
 )
+@cached
 async def get_theme_verses(
     *,
     theme_id: int,
@@ -514,13 +883,25 @@ async def get_theme_verses(
     translate_versions: List[str] = Query([]),
     to_html: bool = False,
     request: Request,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_read_db),
 ):
     """Get all verses related to a defined theme"""
-    theme = db.query(Theme).get(theme_id)
+    theme = (await theme_tree.aget(db)).get(theme_id)
     if theme:
-        sub_themes = db.query(Theme).filter(Theme.parent_id == theme.id).all()
-        if theme.references:
+        sub_themes = theme.children
+        if theme.compiled:
+            main_version, tv = await _clean_versions(version, translate_versions, db)
+            bible_ids = await version_registry.aids(db, tv)
+            main_id = bible_ids.get(main_version)
+            results = (
+                await _theme_references(db, theme.id, main_id, main_version)
+                if main_id
+                else {}
+            )
+            await _load_references(db, results, main_id, main_version, bible_ids)
+            data = {"results": results.values(), "versions": tv}
+        elif theme.references:
+            # not compiled yet (written after the last import)
             data = await search_references(
                 version=version,
                 references=theme.references,
@@ -540,13 +921,138 @@ async def get_theme_verses(
                     "sub_themas": sub_themes,
                 }
             )
-            return TEMPLATES.TemplateResponse("references.html", data)
+            return stream_template("references.html", data)
         return data
     else:
         raise HTTPException(status_code=404, detail=f"Theme {theme_id} not found")
 
 
-def _clean_versions(version: str, translate_versions: list[str], db: Session):
+async def _theme_references(
+    db: AsyncSession, theme_id: int, bible_id: int, version: str
+) -> dict:
+    """Compiled references of a theme with their intervals in one version,
+    in a single query"""
+    rows = await db.execute(
+        select(
+            ThemeReference.position,
+            ThemeReference.book,
+            ThemeReference.location,
+            Book,
+            ThemeInterval.first_rank,
+            ThemeInterval.last_rank,
+        )
+        .outerjoin(
+            Book,
+            and_(Book.bible_id == bible_id, Book.rank == ThemeReference.book_rank),
+        )
+        .outerjoin(
+            ThemeInterval,
+            and_(
+                ThemeInterval.reference_id == ThemeReference.id,
+                ThemeInterval.bible_id == bible_id,
+            ),
+        )
+        .where(ThemeReference.theme_id == theme_id)
+        .order_by(ThemeReference.position, ThemeInterval.first_rank)
+    )
+    results = dict()
+    last = None
+    for position, book_name, location, book, first_rank, last_rank in rows:
+        if position != last:
+            # one row per interval of the reference in the version
+            last = position
+            intervals = []
+            _add_reference(results, version, book, book_name, location, intervals)
+        if first_rank is not None:
+            intervals.append((first_rank, last_rank))
+    return results
+
+
+async def _translations(
+    db: AsyncSession, verses: list, bible_ids: dict, main_version: str
+):
+    """Verses of other versions aligned with given verses, in one query
+
+    Returns:
+        dict: version -> {source verse id -> [aligned verses]}
+    """
+    versions = {bid: v for v, bid in bible_ids.items() if v != main_version}
+    res = {v: defaultdict(list) for v in versions.values()}
+    if verses and versions:
+        rows = await crud.verse.aquery_aligned(
+            db, [v.id for v in verses], list(versions)
+        )
+        for source_id, bible_id, verse in rows.all():
+            res[versions[bible_id]][source_id].append(verse)
+    return res
+
+
+async def _chapter_verses(db: AsyncSession, bible_id: int, vmap, start: int, end: int):
+    """Verses of a whole chapter without translation, from its payload rendered
+    at import. None if start and end are not bounds of one chapter"""
+    book_rank, chapter_rank, _ = vmap.coordinates[start]
+    if vmap.chapter_bounds.get((book_rank, chapter_rank)) != (start, end):
+        return None
+    book = (await book_resolver.aget(db, bible_id)).books.get(book_rank)
+    payload = await crud.chapter.aget_payload(
+        db, bible_id, f"{book.code}.{chapter_rank}"
+    )
+    if not payload:
+        return None
+
+    previous, next_ = vmap.previous(start), vmap.next(end)
+    around = await _verses_at(db, bible_id, (previous, next_))
+    data = VerseItems.model_validate(
+        {
+            "results": [],
+            "count": payload.verse_count,
+            "offset": 0,
+            "total": payload.verse_count,
+            "previous": around.get(previous),
+            "next": around.get(next_),
+        },
+        from_attributes=True,
+    ).model_dump(mode="json")
+    # "results" is the first key, nothing before can contain the placeholder
+    content = dump_json(data).replace(
+        b'"results":[]', b'"results":' + payload.verses, 1
+    )
+    return Response(content=content, media_type="application/json")
+
+
+async def _verses_at(db: AsyncSession, bible_id: int, ranks) -> dict:
+    """rank_all -> verse of the given ranks, None ranks are ignored"""
+    ranks = [r for r in ranks if r]
+    if not ranks:
+        return {}
+    verses = await crud.verse.aget_items(
+        db, bible_id, filters=[Verse.rank_all.in_(ranks)]
+    )
+    return {v.rank_all: v for v in verses}
+
+
+def _decode_cursor(cursor: Optional[str]) -> dict:
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _aligned_list(verses: list, aligned: dict) -> list:
+    """Aligned verses following source verses order, without duplicates"""
+    seen = set()
+    res = []
+    for verse in verses:
+        for v in aligned.get(verse.id, []):
+            if v.id not in seen:
+                seen.add(v.id)
+                res.append(v)
+    return res
+
+
+async def _clean_versions(
+    version: str, translate_versions: list[str], db: AsyncSession
+):
 
     vup = version.upper()
 
@@ -563,7 +1069,6 @@ def _clean_versions(version: str, translate_versions: list[str], db: Session):
 
     tv.insert(0, vup)
 
-    versions_in_db = [b.version.upper() for b in db.query(Bible).all()]
-    tv = list(OrderedSet([v for v in tv if v in versions_in_db]))
+    tv = list(OrderedSet([v for v in tv if await version_registry.aget(db, v)]))
 
     return vup, tv
@@ -1,4 +1,6 @@
-import re
+import base64
+import json
+from typing import Optional
 from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
 
 
@@ -24,31 +26,19 @@ def set_query_parameter(url, new_param_values: dict):
     return urlunsplit((scheme, netloc, path, new_query_string, fragment))
 
 
-def parse_bible_ref(references: str):
-    pattern = r"(?P<book>\d{0,1}\s?\w+)(\s|.)?((?P<chapter>\d+((–|-)\d+)?)((:|.)(?P<verse>(,?\d+((–|-)\d+)?)+))?)?"
-    res = []
-    parts = references.split(";") if references else []
-
-    last_book = None
-    for part in parts:
-        part = part.strip()
-        if part:
-            match = None
-            if not re.search(r"[a-zA-Z]", part) and last_book is not None:
-                part = f"{last_book} {part}"
-
-            for match in re.finditer(pattern, part):
-                book = match["book"].strip() if match["book"] else None
-                last_book = book
-                chapter = match["chapter"].strip() if match["chapter"] else None
-                verses = match["verse"].split(",") if match["verse"] else None
-                res.append(
-                    {
-                        "ref": part,
-                        "book": book,
-                        "chapter": chapter,
-                        "verses": verses,
-                    }
-                )
-
-    return res
+def encode_cursor(**values: int) -> str:
+    """Opaque pagination cursor holding integer values, e.g after=1234"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> dict:
+    """Values of a cursor made by encode_cursor, ValueError if malformed"""
+    if not cursor:
+        return {}
+    values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    if not isinstance(values, dict) or not all(
+        isinstance(v, int) and v >= 0 for v in values.values()
+    ):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return values
@@ -0,0 +1,54 @@
+import pathlib
+
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from markupsafe import Markup
+
+from app.api.cache import ResponseCache
+from app.core.config import settings
+
+BASE_PATH = pathlib.Path(__file__).resolve().parent.parent
+TEMPLATES = Jinja2Templates(directory=str(BASE_PATH / "templates"))
+
+HTML_MEDIA_TYPE = "text/html"
+
+# html of verse groups, cleared with other indexes when a bible changes
+fragment_cache = ResponseCache(
+    settings.FRAGMENT_CACHE_SIZE, settings.RESPONSE_CACHE_TTL
+)
+
+
+def verse_ranges(verses: list) -> tuple:
+    """(bible id, first rank_all, last rank_all) of each run of following verses"""
+    runs = []
+    for verse in verses:
+        bible_id = verse.chapter.book.bible_id
+        if runs and runs[-1][0] == bible_id and runs[-1][2] + 1 == verse.rank_all:
+            runs[-1][2] = verse.rank_all
+        else:
+            runs.append([bible_id, verse.rank_all, verse.rank_all])
+    return tuple(tuple(run) for run in runs)
+
+
+def verse_fragment(template_name: str, verses: list, **context) -> Markup:
+    """Verses rendered with a template, cached by their ranges and the other
+    (hashable) template variables, e.g reference title"""
+    key = (template_name, verse_ranges(verses), tuple(sorted(context.items())))
+    html = fragment_cache.get(key)
+    if html is None:
+        template = TEMPLATES.get_template(template_name)
+        html = template.render(verses=verses, **context)
+        fragment_cache.set(key, html)
+    return Markup(html)
+
+
+TEMPLATES.env.globals["verse_fragment"] = verse_fragment
+
+
+def stream_template(name: str, context: dict) -> StreamingResponse:
+    """Template sent as it renders, instead of once fully rendered
+
+    Context must hold the `request`, as for `TemplateResponse`
+    """
+    template = TEMPLATES.get_template(name)
+    return StreamingResponse(template.generate(context), media_type=HTML_MEDIA_TYPE)
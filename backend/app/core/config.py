@@ -5,10 +5,27 @@ from typing import ClassVar, List, Optional, Union
 from pydantic import AnyHttpUrl, PostgresDsn, field_validator
 from pydantic.types import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy.engine import URL, make_url
 
 # Project Directories
 ROOT = pathlib.Path(__file__).resolve().parent.parent
 
+# async driver of each db backend, for async routes (the schema needs postgres)
+ASYNC_DRIVERS = {"postgresql": "asyncpg"}
+
+# engines of each worker process (sync and async routes), sharing its
+# connections budget
+ENGINES_PER_WORKER = 2
+
+
+def async_url(url: str) -> URL:
+    """Database url with the async driver of its backend"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url
+
 
 class Settings(BaseSettings):
     """Pydantic settings for FASTAPI"""
@@ -16,9 +33,46 @@ class Settings(BaseSettings):
     API_TITLE: str = "choir_api"
     API_VERSION: str = "/api/v1"
     DATABASE_URL: str = ""  # sqlite:///app.db
+    # url of async routes engine, DATABASE_URL with its async driver if empty
+    ASYNC_DATABASE_URL: str = ""
+    # comma separated urls of read replicas serving GET routes, round robin.
+    # A replica failing to connect is left out for DATABASE_READ_EJECT_SECONDS
+    DATABASE_READ_URLS: str = ""
+    DATABASE_READ_EJECT_SECONDS: int = 30
     SECRET_API_KEY: str = ""
     SECRET_API_KEY_TEST: str = ""
 
+    # Worker processes, read by gunicorn too. Each one gets an equal share of
+    # DB_MAX_CONNECTIONS, pool size and overflow are derived from this share
+    # unless set
+    WEB_CONCURRENCY: int = 1
+    DB_MAX_CONNECTIONS: int = 100
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: float = 30  # seconds waiting for a connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before reconnecting, -1 to never
+    DB_POOL_PRE_PING: bool = True
+    # processes importing versions at once (init_db), cpu count if not set,
+    # capped by DB_MAX_CONNECTIONS
+    IMPORT_WORKERS: Optional[int] = None
+    # versions already in db are compared with their files and updated
+    IMPORT_UPDATE: bool = False
+
+    # In-process indexes (verse map, text search index) are built on first
+    # use, or at startup when preload is set
+    INDEX_PRELOAD: bool = False
+    SEARCH_INDEX_ENABLED: bool = True
+
+    # Cache-Control header of bible content responses, empty to leave it out.
+    # ETag and Last-Modified are always sent, from the version fingerprint
+    HTTP_CACHE_CONTROL: str = "public, max-age=3600"
+
+    # In-process cache of chapter, book and reference responses, 0 to disable
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_TTL: int = 3600  # seconds
+    # rendered html of verse groups, shared by to_html pages, 0 to disable
+    FRAGMENT_CACHE_SIZE: int = 4096
+
     # BACKEND_CORS_ORIGINS is a JSON-formatted list of origins
     # e.g: '["http://localhost", "http://localhost:4200", "http://localhost:3000", \
     # "http://localhost:8080" '
@@ -52,6 +106,35 @@ class Settings(BaseSettings):
     def db_url(self):
         return self.DATABASE_URL
 
+    @property
+    def db_pool_options(self) -> dict:
+        """Pool arguments of each engine"""
+        share = self.DB_MAX_CONNECTIONS // max(self.WEB_CONCURRENCY, 1)
+        share = max(share // ENGINES_PER_WORKER, 1)
+        pool_size = self.DB_POOL_SIZE
+        if pool_size is None:
+            pool_size = max(min(5, share // 2), 1)
+        max_overflow = self.DB_MAX_OVERFLOW
+        if max_overflow is None:
+            max_overflow = max(min(10, share - pool_size), 0)
+        return {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+        }
+
+    @property
+    def async_db_url(self) -> Union[str, URL]:
+        return self.ASYNC_DATABASE_URL or async_url(self.DATABASE_URL)
+
+    @property
+    def read_db_urls(self) -> List[str]:
+        return [
+            url.strip() for url in self.DATABASE_READ_URLS.split(",") if url.strip()
+        ]
+
 
 settings = Settings()
 print(settings.db_url)
@@ -1 +1 @@
-from .crud_bible import bible, book, chapter, language, verse  # noqa
+from .crud_bible import bible, book, chapter, language, theme, verse  # noqa
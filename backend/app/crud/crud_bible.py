@@ -1,28 +1,39 @@
-from typing import Generic, TypeVar
+from typing import Generic, List, TypeVar
 
-from sqlalchemy import delete, or_
-from sqlalchemy.orm import Query, Session
+from sqlalchemy import Select, delete, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session, aliased, contains_eager
 
 from app.crud.base import CRUD
 from app.db.base_class import Base
-from app.models.bible import Bible, Book, Chapter, Language, Verse
+from app.models.bible import (
+    Alignment,
+    Bible,
+    Book,
+    Chapter,
+    ChapterPayload,
+    Language,
+    Theme,
+    ThemeReference,
+    Verse,
+)
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
 class CRUDBibleItem(CRUD[ModelType]):
-    def query_by_version(self, db: Session, version) -> Query:
+    def query_by_bible(self, db: Session, bible_id: int) -> Query:
         raise NotImplementedError
 
     def get_items(
         self,
         db: Session,
-        bible_version: str,
+        bible_id: int,
         filters=None,
         ordering=None,
         fetch=False,
     ):
-        q = self.query_by_version(db, bible_version)
+        q = self.query_by_bible(db, bible_id)
         if filters:
             q = q.filter(*filters)
         if ordering:
@@ -30,6 +41,30 @@ class CRUDBibleItem(CRUD[ModelType]):
 
         return q.all() if fetch else q
 
+    def select_by_bible(self, bible_id: int) -> Select:
+        raise NotImplementedError
+
+    async def aget_items(
+        self,
+        db: AsyncSession,
+        bible_id: int,
+        filters=None,
+        ordering=None,
+        offset=None,
+        limit=None,
+    ) -> list:
+        """Async version of `get_items`, always fetched"""
+        stmt = self.select_by_bible(bible_id)
+        if filters:
+            stmt = stmt.where(*filters)
+        if ordering is not None:
+            stmt = stmt.order_by(ordering)
+        if offset:
+            stmt = stmt.offset(offset)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return list((await db.scalars(stmt)).all())
+
 
 class CRUDLanguage(CRUD[Language]):
     """Language model queries"""
@@ -52,6 +87,24 @@ class CRUDBible(CRUD[Bible]):
         """Search bible with version"""
         return db.query(Bible).filter(Bible.version.ilike(version))
 
+    def query_versions(self, db: Session):
+        """(id, version, language code, book count, content hash, import date)
+        of all bibles"""
+        return (
+            db.query(
+                Bible.id,
+                Bible.version,
+                Language.code,
+                func.count(Book.id),
+                Bible.content_hash,
+                Bible.imported_at,
+            )
+            .outerjoin(Language, Bible.lang_id == Language.id)
+            .outerjoin(Book, Book.bible_id == Bible.id)
+            .group_by(Bible.id, Language.code)
+            .all()
+        )
+
     def delete_by_id(self, db: Session, bible_id: int):
         """Delete bible with all its content"""
         obj = db.get(Bible, bible_id)
@@ -63,13 +116,26 @@ class CRUDBible(CRUD[Bible]):
         else:
             raise ValueError(f"Bible with id {bible_id} not found")
 
+    async def adelete_by_id(self, db: AsyncSession, bible_id: int):
+        """Async version of `delete_by_id`"""
+        obj = await db.get(Bible, bible_id)
+        if obj:
+            await db.execute(delete(Book).where(Book.bible_id == obj.id))
+            await db.delete(obj)
+            await db.commit()
+        else:
+            raise ValueError(f"Bible with id {bible_id} not found")
+
 
 class CRUDBook(CRUDBibleItem[Book]):
-    def query_by_version(self, db: Session, version):
-        return db.query(Book).join(Bible).filter(Bible.version.ilike(version))
+    def query_by_bible(self, db: Session, bible_id: int):
+        return db.query(Book).filter(Book.bible_id == bible_id)
+
+    def select_by_bible(self, bible_id: int) -> Select:
+        return select(Book).where(Book.bible_id == bible_id)
 
-    def query_by_name_or_code(self, db: Session, version: str, identifier: str):
-        return self.query_by_version(db, version).filter(
+    def query_by_name_or_code(self, db: Session, bible_id: int, identifier: str):
+        return self.query_by_bible(db, bible_id).filter(
             or_(
                 Book.name.ilike(identifier),
                 Book.short_name.ilike(identifier),
@@ -77,32 +143,162 @@ class CRUDBook(CRUDBibleItem[Book]):
             )
         )
 
+    def query_identifiers(self, db: Session, bible_id: int):
+        """(bible id, book id, rank, code, name, short_name) of books in a bible
+        and in all bibles of the same language"""
+        lang_id = select(Bible.lang_id).where(Bible.id == bible_id).scalar_subquery()
+        return (
+            db.query(
+                Book.bible_id, Book.id, Book.rank, Book.code, Book.name, Book.short_name
+            )
+            .join(Bible, Book.bible_id == Bible.id)
+            .filter(or_(Book.bible_id == bible_id, Bible.lang_id == lang_id))
+            .all()
+        )
+
 
 class CRUDChapter(CRUDBibleItem[Chapter]):
-    def query_by_version(self, db: Session, version):
+    def query_by_bible(self, db: Session, bible_id: int):
+        return db.query(Chapter).join(Book).filter(Book.bible_id == bible_id)
+
+    def select_by_bible(self, bible_id: int) -> Select:
+        return select(Chapter).join(Book).where(Book.bible_id == bible_id)
+
+    @staticmethod
+    def select_payload(bible_id: int, code: str) -> Select:
         return (
-            db.query(Chapter)
-            .join(Book)
-            .join(Bible)
-            .filter(Bible.version.ilike(version))
+            select(ChapterPayload)
+            .where(ChapterPayload.bible_id == bible_id, ChapterPayload.code == code)
+            .order_by(ChapterPayload.id)
+            .limit(1)
         )
 
+    def get_payload(self, db: Session, bible_id: int, code: str):
+        """Chapter JSON rendered at import, None if not rendered"""
+        return db.scalars(self.select_payload(bible_id, code)).first()
+
+    async def aget_payload(self, db: AsyncSession, bible_id: int, code: str):
+        return (await db.scalars(self.select_payload(bible_id, code))).first()
+
 
 class CRUDVerse(CRUDBibleItem[Verse]):
-    def query_by_version(self, db: Session, version):
-        return (
+    @staticmethod
+    def with_book(q: Query) -> Query:
+        """Load chapter and book of verses from the joins of the main statement,
+        so serializing book_rank, book_name... does not lazy load them (async
+        sessions can't lazy load at all)"""
+        return q.options(contains_eager(Verse.chapter).contains_eager(Chapter.book))
+
+    def query_by_bible(self, db: Session, bible_id: int, eager: bool = True):
+        q = db.query(Verse).join(Chapter).join(Book).filter(Book.bible_id == bible_id)
+        return self.with_book(q) if eager else q
+
+    def query_by_bibles(self, db: Session, *bible_ids: int, eager: bool = True):
+        q = (
             db.query(Verse)
             .join(Chapter)
             .join(Book)
-            .join(Bible)
-            .filter(Bible.version.ilike(version))
+            .filter(Book.bible_id.in_(bible_ids))
+        )
+        return self.with_book(q) if eager else q
+
+    def select_by_bible(self, bible_id: int, eager: bool = True) -> Select:
+        stmt = select(Verse).join(Chapter).join(Book).where(Book.bible_id == bible_id)
+        return self.with_book(stmt) if eager else stmt
+
+    def select_aligned(self, verse_ids: List[int], bible_ids: List[int]) -> Select:
+        """Verses of other bibles at same canonical position as given verses,
+        rows of (source verse id, bible id, verse)"""
+        source = aliased(Alignment)
+        target = aliased(Alignment)
+        stmt = (
+            select(source.verse_id, target.bible_id, Verse)
+            .join(target, target.canon_id == source.canon_id)
+            .join(Verse, Verse.id == target.verse_id)
+            .join(Chapter, Verse.chapter_id == Chapter.id)
+            .join(Book, Chapter.book_id == Book.id)
+            .where(source.verse_id.in_(verse_ids), target.bible_id.in_(bible_ids))
+            .order_by(target.bible_id, Verse.rank_all)
+        )
+        return self.with_book(stmt)
+
+    def query_aligned(self, db: Session, verse_ids: List[int], bible_ids: List[int]):
+        """Verses of other bibles at same canonical position as given verses
+
+        Returns:
+            Result: rows of (source verse id, bible id, verse)
+        """
+        return db.execute(self.select_aligned(verse_ids, bible_ids))
+
+    async def aquery_aligned(
+        self, db: AsyncSession, verse_ids: List[int], bible_ids: List[int]
+    ):
+        return await db.execute(self.select_aligned(verse_ids, bible_ids))
+
+    def query_coordinates(self, db: Session, bible_id: int):
+        """(rank_all, book rank, chapter rank, verse rank) of all verses in a bible"""
+        return (
+            db.query(Verse.rank_all, Book.rank, Chapter.rank, Verse.rank)
+            .join(Chapter, Verse.chapter_id == Chapter.id)
+            .join(Book, Chapter.book_id == Book.id)
+            .filter(Book.bible_id == bible_id)
+            .all()
+        )
+
+    def query_text_rows(self, db: Session, bible_id: int):
+        """Searchable text of all verses in a bible, ordered by rank_all"""
+        return (
+            db.query(Verse.id, Verse.content, Verse.subtitle, Book.rank, Chapter.rank)
+            .join(Chapter, Verse.chapter_id == Chapter.id)
+            .join(Book, Chapter.book_id == Book.id)
+            .filter(Book.bible_id == bible_id)
+            .order_by(Verse.rank_all)
+            .all()
         )
 
-    def query_by_versions(self, db: Session, *versions):
-        q = db.query(Verse).join(Chapter).join(Book).join(Bible)
-        version_filter = [Bible.version.ilike(version) for version in versions]
-        q = q.filter(or_(*version_filter))
-        return q
+
+class CRUDTheme(CRUD[Theme]):
+    """Theme model queries"""
+
+    def query_tree(self, db: Session):
+        """(id, name, parent id, language code, references, compiled references,
+        depth, compiled reference count) of all themes reachable from a root
+        theme, parents first, in one recursive query"""
+        tree = (
+            select(
+                Theme.id,
+                Theme.parent_id,
+                literal(0).label("depth"),
+            )
+            .where(Theme.parent_id.is_(None))
+            .cte("tree", recursive=True)
+        )
+        tree = tree.union_all(
+            select(Theme.id, Theme.parent_id, tree.c.depth + 1).join(
+                tree, Theme.parent_id == tree.c.id
+            )
+        )
+        counts = (
+            select(ThemeReference.theme_id, func.count().label("count"))
+            .group_by(ThemeReference.theme_id)
+            .subquery()
+        )
+        return db.execute(
+            select(
+                Theme.id,
+                Theme.name,
+                Theme.parent_id,
+                Language.code,
+                Theme.references,
+                Theme.compiled_references,
+                tree.c.depth,
+                func.coalesce(counts.c.count, 0),
+            )
+            .join(tree, tree.c.id == Theme.id)
+            .outerjoin(Language, Theme.lang_id == Language.id)
+            .outerjoin(counts, counts.c.theme_id == Theme.id)
+            .order_by(tree.c.depth, Theme.id)
+        ).all()
 
 
 language = CRUDLanguage(Language)
@@ -110,3 +306,4 @@ book = CRUDBook(Book)
 bible = CRUDBible(Bible)
 chapter = CRUDChapter(Chapter)
 verse = CRUDVerse(Verse)
+theme = CRUDTheme(Theme)
@@ -1,5 +1,16 @@
 # Import all the models, so that Base has them before being
 # imported by Alembic
-from app.models.bible import Bible, Book, Chapter, Language, Verse  # noqa
+from app.models.bible import (  # noqa
+    Alignment,
+    Bible,
+    Book,
+    Chapter,
+    ChapterPayload,
+    Language,
+    Theme,
+    ThemeInterval,
+    ThemeReference,
+    Verse,
+)
 
 from .base_class import Base  # noqa
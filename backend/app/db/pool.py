@@ -0,0 +1,87 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Counters of connection checkouts, see `InstrumentedPool`"""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0  # seconds
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+
+class InstrumentedPool:
+    """Queue pool mixin timing how long each checkout waits for a connection,
+    including the connect time of overflow connections"""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timeout=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+
+class InstrumentedAsyncPool(InstrumentedPool, AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+
+def pool_stats(engine: Engine) -> dict:
+    """Current usage and checkout counters of an engine pool"""
+    pool = engine.pool
+    res = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        res.update(
+            {
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # negative while fewer than `size` connections are open
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            }
+        )
+    stats = getattr(pool, "stats", None)
+    if stats:
+        res.update(
+            {
+                "checkouts": stats.checkouts,
+                "timeouts": stats.timeouts,
+                "wait_avg_ms": round(
+                    1000 * stats.wait_total / max(stats.checkouts + stats.timeouts, 1),
+                    3,
+                ),
+                "wait_max_ms": round(1000 * stats.wait_max, 3),
+            }
+        )
+    return res
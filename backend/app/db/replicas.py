@@ -0,0 +1,120 @@
+import itertools
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import async_url
+from app.db.pool import InstrumentedAsyncPool, InstrumentedQueuePool, pool_stats
+
+logger = logging.getLogger(__name__)
+
+# errors of a replica that can't be reached
+CONNECT_ERRORS = (exc.DBAPIError, OSError)
+
+
+class Replica:
+    """Sync and async engines of one read replica"""
+
+    def __init__(self, url: str, **pool_options) -> None:
+        self.url = make_url(url)
+        self.engine = create_engine(
+            self.url, poolclass=InstrumentedQueuePool, **pool_options
+        )
+        self.async_engine = create_async_engine(
+            async_url(url), poolclass=InstrumentedAsyncPool, **pool_options
+        )
+        self.ejected_at: Optional[float] = None
+        for engine in (self.engine, self.async_engine.sync_engine):
+            event.listen(engine, "handle_error", self._handle_error)
+
+    def __str__(self):
+        return self.url.render_as_string(hide_password=True)
+
+    def eject(self):
+        if self.ejected_at is None:
+            logger.warning("Read replica %s ejected", self)
+        self.ejected_at = time.monotonic()
+
+    def _handle_error(self, context):
+        # connection lost while in use
+        if context.is_disconnect:
+            self.eject()
+
+
+class ReadReplicas:
+    """Read replicas used in turn, an ejected replica is tried again
+    `eject_seconds` after its last failure"""
+
+    def __init__(self, replicas: List[Replica], eject_seconds: float = 30) -> None:
+        self.replicas = replicas
+        self.eject_seconds = eject_seconds
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def candidates(self) -> List[Replica]:
+        """Replicas not ejected, next one in turn first"""
+        if not self.replicas:
+            return []
+        with self._lock:
+            start = next(self._turn) % len(self.replicas)
+        now = time.monotonic()
+        return [
+            replica
+            for replica in self.replicas[start:] + self.replicas[:start]
+            if replica.ejected_at is None
+            or now - replica.ejected_at > self.eject_seconds
+        ]
+
+    def session(self, factory: sessionmaker) -> Optional[Session]:
+        """Session connected to a replica, None if no replica is reachable"""
+        for replica in self.candidates():
+            db = factory(bind=replica.engine)
+            try:
+                db.connection()
+            except CONNECT_ERRORS:
+                db.close()
+                replica.eject()
+                continue
+            replica.ejected_at = None
+            return db
+        return None
+
+    async def async_session(
+        self, factory: async_sessionmaker
+    ) -> Optional[AsyncSession]:
+        """Async version of `session`"""
+        for replica in self.candidates():
+            db = factory(bind=replica.async_engine)
+            try:
+                await db.connection()
+            except CONNECT_ERRORS:
+                await db.close()
+                replica.eject()
+                continue
+            replica.ejected_at = None
+            return db
+        return None
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.async_engine.dispose()
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "url": str(replica),
+                "ejected": replica.ejected_at is not None,
+                "sync": pool_stats(replica.engine),
+                "async": pool_stats(replica.async_engine.sync_engine),
+            }
+            for replica in self.replicas
+        ]
@@ -1,12 +1,44 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncPool, InstrumentedQueuePool
+from app.db.replicas import ReadReplicas, Replica
 
 engine = create_engine(
-    settings.db_url
+    settings.db_url,
+    poolclass=InstrumentedQueuePool,
+    **settings.db_pool_options,
     # required for sqlite
     # connect_args={"check_same_thread": False},
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# async routes engine, same db through an async driver
+async_engine = create_async_engine(
+    settings.async_db_url,
+    poolclass=InstrumentedAsyncPool,
+    **settings.db_pool_options,
+)
+
+# objects stay loaded after commit, they can't lazy load outside of a query
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+# read only routes go to replicas when configured, primary db otherwise
+read_replicas = ReadReplicas(
+    [Replica(url, **settings.db_pool_options) for url in settings.read_db_urls],
+    settings.DATABASE_READ_EJECT_SECONDS,
+)
+
+
+def read_session() -> Session:
+    """Session on a reachable read replica, on primary db if there is none"""
+    return read_replicas.session(SessionLocal) or SessionLocal()
+
+
+async def async_read_session() -> AsyncSession:
+    return await read_replicas.async_session(AsyncSessionLocal) or AsyncSessionLocal()
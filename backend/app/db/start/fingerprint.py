@@ -0,0 +1,54 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.models.bible import Bible, Book, Chapter, Verse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_bible(db: Session, bible_id: int, force: bool = False) -> str:
+    """Hash of a bible content (books and verses), saved on the bible row
+
+    `imported_at` is updated only when content changed, both are used as HTTP
+    validators (ETag, Last-Modified).
+
+    Args:
+        force (bool): compute again even if bible already has a hash
+
+    Returns:
+        str: sha256 hex digest
+    """
+    bible = db.get(Bible, bible_id)
+    if bible.content_hash and not force:
+        return bible.content_hash
+
+    digest = hashlib.sha256()
+    books = (
+        db.query(Book.rank, Book.code, Book.name, Book.short_name, Book.category)
+        .filter(Book.bible_id == bible_id)
+        .order_by(Book.rank)
+    )
+    for row in books:
+        digest.update(repr(tuple(row)).encode())
+    verses = (
+        db.query(Verse.rank_all, Verse.code, Verse.subtitle, Verse.content, Verse.refs)
+        .join(Chapter, Verse.chapter_id == Chapter.id)
+        .join(Book, Chapter.book_id == Book.id)
+        .filter(Book.bible_id == bible_id)
+        .order_by(Verse.rank_all)
+        .yield_per(5000)
+    )
+    for row in verses:
+        digest.update(repr(tuple(row)).encode())
+
+    content_hash = digest.hexdigest()
+    if content_hash != bible.content_hash:
+        bible.content_hash = content_hash
+        bible.imported_at = datetime.now(timezone.utc)
+        db.commit()
+    logger.info("Bible %s fingerprint : %s", bible_id, content_hash)
+    return content_hash
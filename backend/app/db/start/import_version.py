@@ -2,14 +2,26 @@ import enum
 import logging
 import os
 import pathlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
 
 import pydantic_core
 from pydash import omit
-from sqlalchemy import null, or_
+from sqlalchemy import case, func, null, or_, update
 
 from app import crud
+from app.core.config import settings
 from app.db.session import SessionLocal
 from app.db.start.constants import BOOK_CODES
+from app.db.start.fingerprint import fingerprint_bible
+from app.db.start.loader import BulkLoader
+from app.db.start.payloads import refresh_payloads, store_payloads
+from app.db.start.stream import BibleEvent, bible_item_events, json_bible_events
+from app.db.start.themes import compile_themes
+from app.db.start.update import update_version
+from app.db.start.versification import align_verses
+from app.index import invalidate_indexes
+from app.index.text import fold_verse_text
 from app.models.bible import Bible, Book, BookTypeEnum, Chapter, Verse
 from app.schemas.bible import BibleItem
 
@@ -37,8 +49,20 @@ class RulesEnum(enum.Enum):
     COUNT_ALL_VERSE = "count_all_verse"
 
 
+class VersionStats(NamedTuple):
+    """Counts of one version, gathered in one query"""
+
+    books: Dict[int, Tuple[int, BookTypeEnum]]  # id: (rank, category)
+    chapters: Dict[int, List[Tuple[int, int]]]  # book id: [(rank, verse count)]
+    empty_verses: int
+
+
 class BibleValidator:
-    """Validator class to validate bible content"""
+    """Validator class to validate bible content
+
+    Rules are checked against counts of books, chapters and verses read at
+    once (see `stats`), every failed rule is reported.
+    """
 
     def __init__(self, bible_id: int, rules: dict = None) -> None:
         if not bible_id or bible_id <= 0:
@@ -47,114 +71,193 @@ class BibleValidator:
         self.bible_id = bible_id
         self.rules = rules
         self.version_filter = [Book.bible_id == self.bible_id]
+        self._stats = None
 
-    def run(self):
-        """Validate this version by running all defined rules"""
-        if self.rules:
-            for rule in self.rules:
+    def run(self) -> List[str]:
+        """Validate this version by running all defined rules
+
+        Raises:
+            AssertionError: listing all failures
+        """
+        failures = []
+        try:
+            for rule in self.rules or []:
                 logger.debug("Checking rule %s", rule)
-                getattr(self, rule[0].value)(*rule[1])
+                failures.extend(getattr(self, rule[0].value)(*rule[1]))
+        finally:
+            self.db.close()
+        if failures:
+            raise AssertionError(
+                f"Bible {self.bible_id}, {len(failures)} failures :\n- "
+                + "\n- ".join(failures)
+            )
+        return failures
+
+    @property
+    def stats(self) -> VersionStats:
+        """Verse count of each chapter, grouped by book and chapter"""
+        if self._stats is None:
+            empty = or_(
+                Verse.content.ilike("???"),
+                Verse.content == "",
+                Verse.content == null(),
+            )
+            rows = (
+                self.db.query(
+                    Book.id,
+                    Book.rank,
+                    Book.category,
+                    Chapter.rank,
+                    func.count(Verse.id),
+                    func.count(case((empty, Verse.id))),
+                )
+                .outerjoin(Chapter, Chapter.book_id == Book.id)
+                .outerjoin(Verse, Verse.chapter_id == Chapter.id)
+                .filter(*self.version_filter)
+                .group_by(Book.id, Chapter.id)
+            )
+            stats = VersionStats({}, defaultdict(list), 0)
+            empty_verses = 0
+            for book_id, rank, category, chapter_rank, count, empty_count in rows:
+                stats.books[book_id] = (rank, category)
+                if chapter_rank is not None:
+                    stats.chapters[book_id].append((chapter_rank, count))
+                empty_verses += empty_count
+            self._stats = stats._replace(empty_verses=empty_verses)
+        return self._stats
 
     def book_count(self, expected):
         """Checks numbers of book in this version"""
-        assert self._q_book().count() == expected
+        return _check("books", len(self.stats.books), expected)
 
     def boot_count_by_category(self, category, expected):
         """Compare book count by category to expected"""
-        assert self._q_book().filter(Book.category == category).count() == expected
+        count = sum(c == category for _, c in self.stats.books.values())
+        return _check(f"{category.name} books", count, expected)
 
     def book_category(self, rank, expected):
-        """assert books placed in right category
+        """Check that books are placed in the right category
 
         Args:
             rank (int): book rank
             expected (BookTypeEnum): expected category
         """
-        assert self._q_book().filter(Book.rank == rank).first().category == expected
+        categories = [c for r, c in self.stats.books.values() if r == rank]
+        if not categories:
+            return [f"book {rank} : missing"]
+        return _check(f"book {rank} category", categories[0], expected)
 
     def book_chapter_count(self, book_rank, expected_chapter_count):
         """Check number of chapters in a book"""
-        assert (
-            self._q_chapter().filter(Book.rank == book_rank).count()
-            == expected_chapter_count
-        )
+        count = sum(len(self.stats.chapters[b]) for b in self._book_ids(book_rank))
+        return _check(f"book {book_rank} chapters", count, expected_chapter_count)
 
     def count_all_verse(self, expected, *book_category):
         """Count all verse based on book_category"""
-        q = self._q_verse()
-        if book_category:
-            q = q.filter(Book.category.in_(book_category))
-        assert q.count() == expected
+        count = sum(
+            verses
+            for book_id, (_, category) in self.stats.books.items()
+            if not book_category or category in book_category
+            for _, verses in self.stats.chapters[book_id]
+        )
+        label = "/".join(c.name for c in book_category) or "all"
+        return _check(f"{label} verses", count, expected)
 
     def count_verse(self, book_rank, chapter_rank, expected):
         """Compare numbers of verses in chapter to expected"""
-        assert (
-            self._q_verse()
-            .filter(Book.rank == book_rank, Chapter.rank == chapter_rank)
-            .count()
-            == expected
+        count = sum(
+            verses
+            for book_id in self._book_ids(book_rank)
+            for rank, verses in self.stats.chapters[book_id]
+            if rank == chapter_rank
         )
+        return _check(f"chapter {book_rank}.{chapter_rank} verses", count, expected)
 
     def verse_text(self, book_rank, chapter_rank, verse_rank, expected):
         """Check if verse content is as excepted"""
-        v = (
-            self._q_verse()
+        content = (
+            self.db.query(Verse.content)
+            .join(Chapter)
+            .join(Chapter.book)
             .filter(
+                *self.version_filter,
                 Book.rank == book_rank,
                 Chapter.rank == chapter_rank,
                 Verse.rank == verse_rank,
             )
-            .first()
+            .order_by(Verse.rank_all)
+            .limit(1)  # first one if a chapter repeats the verse rank
+            .scalar()
         )
-        assert v is not None and v.content == expected
+        label = f"verse {book_rank}.{chapter_rank}.{verse_rank} text"
+        return _check(label, content, expected)
 
     def all_verse_present(self):
         """Check if all verses are not empty"""
-        assert (
-            self._q_verse()
-            .filter(
-                or_(
-                    Verse.content.ilike("???"),
-                    Verse.content == "",
-                    Verse.content == null(),
-                )
-            )
-            .count()
-            == 0
-        )
+        return _check("empty verses", self.stats.empty_verses, 0)
 
     def verse_per_book(self, expected: dict):
-        """Check if verses count per book is ok"""
-        books = self._q_book().all()
-        for b in books:
-            logger.info("Checking book %s, rank:%s", b, b.rank)
-            expected_chapters = expected.get(b.rank).get("chapters")
-            current_verses = sum([c.verse_count for c in b.chapters])
-            expected_verses = expected.get(b.rank).get("verses")
-
-            logger.info(
-                "chapters : %s vs expected: %s | verses : %s vs expected: %s",
-                b.chapter_count,
-                expected_chapters,
-                current_verses,
-                expected_verses,
+        """Check if chapter and verse counts of each book are ok"""
+        failures = []
+        ranks = set()
+        for book_id, (rank, _) in self.stats.books.items():
+            ranks.add(rank)
+            chapters = self.stats.chapters[book_id]
+            if rank not in expected:
+                failures.append(f"book {rank} : not expected")
+                continue
+            failures += _check(
+                f"book {rank} chapters", len(chapters), expected[rank]["chapters"]
+            )
+            failures += _check(
+                f"book {rank} verses",
+                sum(verses for _, verses in chapters),
+                expected[rank]["verses"],
             )
-            assert b.chapter_count == expected_chapters
-            assert current_verses == expected_verses
+        failures += [f"book {rank} : missing" for rank in expected if rank not in ranks]
+        return failures
 
-    def _q_book(self):
-        return self.db.query(Book).filter(*self.version_filter)
+    def _book_ids(self, rank: int) -> List[int]:
+        return [b for b, (r, _) in self.stats.books.items() if r == rank]
 
-    def _q_chapter(self):
-        return self.db.query(Chapter).join(Chapter.book).filter(*self.version_filter)
 
-    def _q_verse(self):
-        return (
-            self.db.query(Verse)
-            .join(Chapter)
-            .join(Chapter.book)
-            .filter(*self.version_filter)
+def _check(label: str, value, expected) -> List[str]:
+    """Failure message if value is not the expected one"""
+    if value == expected:
+        return []
+    return [f"{label} : {value!r}, expected {expected!r}"]
+
+
+def fold_verses(db, bible_id: int, batch_size: int = 5000) -> int:
+    """Fill folded text of verses imported before the column existed
+
+    Returns:
+        int: number of updated verses
+    """
+    ids = (
+        db.query(Verse.id)
+        .join(Chapter)
+        .join(Chapter.book)
+        .filter(Book.bible_id == bible_id, Verse.folded_text == null())
+    )
+    verse_ids = [vid for vid, in ids.all()]
+    for i in range(0, len(verse_ids), batch_size):
+        rows = (
+            db.query(Verse.id, Verse.content, Verse.subtitle)
+            .filter(Verse.id.in_(verse_ids[i : i + batch_size]))
+            .all()
+        )
+        db.execute(
+            update(Verse),
+            [
+                {"id": vid, "folded_text": fold_verse_text(content, subtitle)}
+                for vid, content, subtitle in rows
+            ],
         )
+    db.commit()
+    if verse_ids:
+        logger.info("Bible %s : %s verses folded", bible_id, len(verse_ids))
+    return len(verse_ids)
 
 
 def importer_cls(*args, **kwargs):
@@ -185,99 +288,86 @@ class BibleImporter:
         self.file_type = None
 
         self.book_codes = BOOK_CODES
+        # themes compiled after import, left to the caller of parallel imports
+        self.with_themes = kwargs.get("with_themes", True)
+        # existing version updated with the changes of its file
+        self.update = kwargs.get("update", settings.IMPORT_UPDATE)
+        self.diff = None
 
     def import_version(self, bible_item: BibleItem):
+        return self.import_events(bible_item_events(bible_item))
+
+    def import_events(self, events: Iterable[BibleEvent]):
+        """Import a version given as a stream of bible, books and chapters (see
+        json_bible_events)
+
+        Events of an existing version are read only to update it (`update`),
+        changes are kept in `diff`.
+        """
         existing_version = self._get_existing_version()
         if existing_version:
-            # update to manage later
             self.bible_id = existing_version.id
+            fold_verses(self.db, self.bible_id)
+            align_verses(self.db, self.bible_id)
+            fingerprint_bible(self.db, self.bible_id)
+            store_payloads(self.db, self.bible_id)
+            if self.update:
+                self._update_version(events)
         else:
-            bible = Bible(**(omit(bible_item.__dict__, "books", "lang")))
-            bible.lang_id = self.language.id
-            crud.bible.create(self.db, bible)
-
-            rank_all = 1
-
-            self.bible_id = bible.id  # save newly created bible id, used later on
-            logger.info("Bible %s inserted, id: %s", self.version, self.bible_id)
-
-            books = bible_item.books
-            for b in books:
-                book = Book(**(omit(b.__dict__, "chapters", "chapter_count")))
-                if not book.short_name:
-                    if (
-                        book.name[0].isdigit()
-                        or book.name.startswith("1")
-                        or book.name.startswith("2")
-                    ):
-                        book.short_name = book.name[:5]
-                    else:
-                        book.short_name = book.name[:3]
-                book.short_name = book.short_name.capitalize()
-                book.category = BookTypeEnum(b.category)
-                if self.book_codes.get(book.rank, None):
-                    book.code = self.book_codes.get(book.rank)
-                book.bible_id = bible.id
-                crud.book.create(self.db, book)
-
-                if b.chapters:
+            loader = book = None
+            for kind, item in events:
+                if kind == "bible":
+                    bible = Bible(**(omit(item.__dict__, "books", "lang")))
+                    bible.lang_id = self.language.id
+                    self.db.add(bible)
+                    self.db.flush()
+
+                    self.bible_id = bible.id  # save newly created bible id
                     logger.info(
-                        "%s Inserting book %s with %s chapters ...",
-                        self.version,
-                        book,
-                        len(b.chapters),
+                        "Bible %s inserted, id: %s", self.version, self.bible_id
                     )
-                    for chap in b.chapters:
-                        chapter = Chapter(
-                            **(omit(chap.__dict__, "book_rank", "verses", "name"))
-                        )  # "book_id",
-                        chapter.book_id = book.id
-                        chapter.code = f"{book.code}.{chapter.rank}"
-                        crud.chapter.create(self.db, chapter)
-
-                        if chap.verses:
-                            for v in chap.verses:
-                                verse = Verse(
-                                    **(
-                                        omit(
-                                            v.__dict__,
-                                            "chapter_rank",
-                                            "book_rank",
-                                            "book_name",
-                                            "book_short_name",
-                                        )
-                                    )
-                                )
-                                content = verse.content
-                                if content and content.startswith("["):
-                                    try:
-                                        x = content.index("]")
-                                        if x:
-                                            maybe_subtitle = content[0 : x + 1]  # 0,x+1
-                                            maybe_content = content[x + 1 :].strip()
-                                            if maybe_content:
-                                                verse.content = maybe_content
-                                                verse.subtitle = maybe_subtitle
-                                    except ValueError:
-                                        ...
-                                verse.chapter_id = chapter.id
-                                verse.code = "%s.%02d.%02d" % (
-                                    book.code,
-                                    chapter.rank,
-                                    verse.rank,
-                                )
-                                verse.rank_all = rank_all
-                                if verse.content and any(
-                                    ch.isalpha() for ch in verse.content
-                                ):
-                                    rank_all += 1
-                                    chapter.verses.append(verse)
-
+                    # whole version loaded in one transaction
+                    loader = BulkLoader(
+                        self.db,
+                        self.bible_id,
+                        self.language.text_search_config,
+                        self.book_codes,
+                    )
+                elif kind == "book":
+                    book = loader.add_book(item)
+                else:
+                    loader.add_chapter(book, item)
+            loader.flush()
             self.db.commit()
-            logger.info("%s book inserted.", len(books))
-
+            logger.info(
+                "%s books, %s chapters, %s verses inserted.",
+                loader.counts["books"],
+                loader.counts["chapters"],
+                loader.counts["verses"],
+            )
+            align_verses(self.db, self.bible_id)
+            fingerprint_bible(self.db, self.bible_id)
+            store_payloads(self.db, self.bible_id)
+
+        invalidate_indexes(self.bible_id)
+        if self.with_themes:
+            # theme references resolved again, with this version intervals
+            compile_themes(self.db)
         return self.bible_id
 
+    def _update_version(self, events: Iterable[BibleEvent]):
+        self.diff = update_version(
+            self.db,
+            self.bible_id,
+            events,
+            self.language.text_search_config,
+            self.book_codes,
+        )
+        if self.diff.changed:
+            align_verses(self.db, self.bible_id, book_ids=self.diff.book_ids)
+            refresh_payloads(self.db, self.bible_id, self.diff.chapter_ids)
+            fingerprint_bible(self.db, self.bible_id, force=True)
+
     def run_import(self, validate=True):
         self.import_data()
         if validate:
@@ -332,13 +422,18 @@ class JsonBible(BibleImporter):
     def __init__(self, *args, **kwargs):
         super(JsonBible, self).__init__(*args, **kwargs)
         self.file_type = "json"
+        # read file as a stream, instead of parsing it at once
+        self.stream = kwargs.get("stream", True)
 
     def import_data(self):
         """
         Import generic bible with <BibleItem> json format in input
         """
         file_path = self.file_path or self.default_file_path()
-        with open(file_path, "r+", encoding=self.file_encoding) as f:
-            datas = f.read()
-            bible_item = BibleItem.model_validate(pydantic_core.from_json(datas))
-            super().import_version(bible_item)
+        with open(file_path, "r", encoding=self.file_encoding) as f:
+            if self.stream:
+                super().import_events(json_bible_events(f))
+            else:
+                datas = f.read()
+                bible_item = BibleItem.model_validate(pydantic_core.from_json(datas))
+                super().import_version(bible_item)
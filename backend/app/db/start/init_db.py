@@ -1,7 +1,7 @@
 import logging
 
-from app.db.start.import_version import importer_cls
 from app.db.start.init_langs import init_languages
+from app.db.start.parallel import import_versions
 from app.db.start.rules import EN_RULES, KJV_RULES, MG_RULES, STANDARD_RULES
 
 logging.basicConfig(level=logging.INFO)
@@ -51,9 +51,11 @@ def main() -> None:
         },  # OK
     ]
 
-    for b in bibles:
-        importer = importer_cls(**b)
-        importer.run_import()  # validate=False
+    # validate=False in a version to skip its validation
+    results = import_versions(bibles)
+    failed = [r.version for r in results if not r.ok]
+    if failed:
+        raise RuntimeError(f"Import failed for {', '.join(failed)}")
 
     logger.info("Init done !")
 
@@ -0,0 +1,270 @@
+import hashlib
+import io
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydash import omit
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.db.start.constants import BOOK_CODES
+from app.index.text import fold_verse_text
+from app.models.bible import Book, BookTypeEnum, Chapter, Verse
+from app.schemas.bible import BookItem, ChapterItem, VerseItem
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# verse columns in COPY order
+VERSE_COLUMNS = (
+    "chapter_id",
+    "rank",
+    "rank_all",
+    "code",
+    "subtitle",
+    "content",
+    "refs",
+    "ts_config",
+    "folded_text",
+)
+
+
+def split_subtitle(content: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """'[Title] text' -> ('[Title]', 'text'), (None, content) if there is no
+    title or nothing follows it"""
+    if content and content.startswith("["):
+        x = content.find("]")
+        if x > 0:
+            maybe_content = content[x + 1 :].strip()
+            if maybe_content:
+                return content[0 : x + 1], maybe_content
+    return None, content
+
+
+def has_text(content: Optional[str]) -> bool:
+    """Verses without any letter are not imported"""
+    return bool(content) and any(ch.isalpha() for ch in content)
+
+
+def book_row(b: BookItem, bible_id: int, book_codes: dict = BOOK_CODES) -> dict:
+    """Book columns from an imported book"""
+    row = omit(b.__dict__, "chapters", "chapter_count")
+    short_name = row.get("short_name")
+    if not short_name:
+        name = row["name"]
+        if name[0].isdigit() or name.startswith("1") or name.startswith("2"):
+            short_name = name[:5]
+        else:
+            short_name = name[:3]
+    row["short_name"] = short_name.capitalize()
+    row["category"] = BookTypeEnum(b.category)
+    if book_codes.get(b.rank, None):
+        row["code"] = book_codes.get(b.rank)
+    row["bible_id"] = bible_id
+    return row
+
+
+def chapter_row(chap: ChapterItem, book_id: int, book_code: Optional[str]) -> dict:
+    """Chapter columns from an imported chapter"""
+    return {
+        "rank": chap.rank,
+        "code": f"{book_code}.{chap.rank}",
+        "book_id": book_id,
+    }
+
+
+def verse_row(
+    v: VerseItem,
+    chapter_id: int,
+    book_code: Optional[str],
+    chapter_rank: int,
+    rank_all: int,
+    ts_config: str,
+) -> dict:
+    """Verse columns from an imported verse, title moved out of content to
+    subtitle"""
+    subtitle, content = split_subtitle(v.content)
+    if subtitle is None:
+        subtitle = v.subtitle
+    return {
+        "chapter_id": chapter_id,
+        "rank": v.rank,
+        "rank_all": rank_all,
+        "code": "%s.%02d.%02d" % (book_code, chapter_rank, v.rank),
+        "subtitle": subtitle,
+        "content": content,
+        "refs": v.refs,
+        "ts_config": ts_config,
+        "folded_text": fold_verse_text(content, subtitle),
+    }
+
+
+def chapter_verses(
+    chap: ChapterItem,
+    chapter_id: int,
+    book_code: Optional[str],
+    first_rank_all: int,
+    ts_config: str,
+) -> List[dict]:
+    """Rows of the verses of a chapter with text, `rank_all` counted from
+    `first_rank_all`"""
+    rows = []
+    for v in chap.verses or []:
+        row = verse_row(
+            v, chapter_id, book_code, chap.rank, first_rank_all + len(rows), ts_config
+        )
+        if has_text(row["content"]):
+            rows.append(row)
+    return rows
+
+
+def verse_key(row) -> tuple:
+    """Verse content compared between imports, `rank_all` aside"""
+    return (row["rank"], row["code"], row["subtitle"], row["content"], row["refs"])
+
+
+def chapter_hash(code: str, verses: Iterable) -> str:
+    """Hash of a chapter and its verses content, stored to find changed
+    chapters when a version is imported again (see update_version)
+
+    Verses shifted by a change in a previous chapter keep their hash.
+    """
+    digest = hashlib.sha256(repr(code).encode())
+    for row in verses:
+        digest.update(repr(verse_key(row)).encode())
+    return digest.hexdigest()
+
+
+def _copy_value(value) -> str:
+    """Value in postgres COPY text format"""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class IdAllocator:
+    """Primary keys taken ahead from a table sequence, so rows referencing
+    each other are inserted in batches without reading ids back
+
+    Postgres only (`pg_get_serial_sequence`, `generate_series`), as the
+    schema itself.
+    """
+
+    def __init__(self, db: Session, table: str, block_size: int = 1000) -> None:
+        self.db = db
+        self.table = table
+        self.block_size = block_size
+        self._ids: List[int] = []
+
+    def next(self) -> int:
+        if not self._ids:
+            self._ids = list(
+                self.db.execute(
+                    text(
+                        "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                        "FROM generate_series(1, :n)"
+                    ),
+                    {"table": self.table, "n": self.block_size},
+                ).scalars()
+            )
+            self._ids.reverse()
+        return self._ids.pop()
+
+
+class BulkLoader:
+    """Books, chapters and verses of one new bible inserted in batches, in the
+    transaction of `db` (committed by the caller)
+
+    Postgres only (see IdAllocator). Verses are sent with COPY when the driver
+    supports it (psycopg2), with executemany inserts on other postgres drivers
+    (psycopg 3, pg8000). Verses without text are skipped, `rank_all` counts
+    imported verses only.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        bible_id: int,
+        ts_config: str,
+        book_codes: dict = BOOK_CODES,
+        batch_size: int = 5000,
+    ) -> None:
+        self.db = db
+        self.bible_id = bible_id
+        self.ts_config = ts_config
+        self.book_codes = book_codes
+        self.batch_size = batch_size
+        self.rank_all = 1
+        self.counts = {"books": 0, "chapters": 0, "verses": 0}
+        # verses are not referenced by other rows, their ids are left to db
+        self._ids = {
+            "book": IdAllocator(db, Book.__tablename__, 100),
+            "chapter": IdAllocator(db, Chapter.__tablename__),
+        }
+        self._rows: Dict[str, list] = {"book": [], "chapter": [], "verse": []}
+
+    def add_book(self, b: BookItem) -> dict:
+        """Queue a book with its chapters and verses, chapters may be added
+        later with `add_chapter`"""
+        row = book_row(b, self.bible_id, self.book_codes)
+        row["id"] = self._ids["book"].next()
+        self._rows["book"].append(row)
+        self.counts["books"] += 1
+        logger.info("Bible %s queuing book %s ...", self.bible_id, row["name"])
+        for chap in b.chapters or []:
+            self.add_chapter(row, chap)
+        return row
+
+    def add_chapter(self, book: dict, chap: ChapterItem) -> dict:
+        row = chapter_row(chap, book["id"], book["code"])
+        row["id"] = self._ids["chapter"].next()
+        verses = chapter_verses(
+            chap, row["id"], book["code"], self.rank_all, self.ts_config
+        )
+        row["content_hash"] = chapter_hash(row["code"], verses)
+        self._rows["chapter"].append(row)
+        self.counts["chapters"] += 1
+        self.add_verses(verses)
+        return row
+
+    def add_verses(self, rows: List[dict]):
+        """Queue verse rows, see chapter_verses"""
+        for row in rows:
+            self._rows["verse"].append(row)
+            self.rank_all += 1
+            if len(self._rows["verse"]) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Insert queued rows, parents first"""
+        books, chapters, verses = (self._rows[t] for t in ("book", "chapter", "verse"))
+        if books:
+            self.db.execute(insert(Book), books)
+        if chapters:
+            self.db.execute(insert(Chapter), chapters)
+        if verses:
+            self._insert_verses(verses)
+        self.counts["verses"] += len(verses)
+        self._rows = {"book": [], "chapter": [], "verse": []}
+
+    def _insert_verses(self, rows: List[dict]):
+        connection = self.db.connection()
+        if connection.dialect.driver != "psycopg2":
+            self.db.execute(insert(Verse), rows)
+            return
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(
+                "\t".join(_copy_value(row[col]) for col in VERSE_COLUMNS) + "\n"
+            )
+        buffer.seek(0)
+        with connection.connection.driver_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY verse ({', '.join(VERSE_COLUMNS)}) FROM STDIN", buffer
+            )
@@ -0,0 +1,136 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.db.start.import_version import importer_cls
+from app.db.start.themes import compile_themes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# sessions of one import: importer and validator
+CONNECTIONS_PER_IMPORT = 2
+
+
+class ImportResult(NamedTuple):
+    version: str
+    bible_id: Optional[int]
+    error: Optional[str]  # None if imported and validated
+    load_seconds: float
+    validate_seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def import_workers(job_count: int) -> int:
+    """Processes to import versions at once, IMPORT_WORKERS or cpu count,
+    within the db connection budget"""
+    workers = settings.IMPORT_WORKERS or os.cpu_count() or 1
+    budget = max(settings.DB_MAX_CONNECTIONS // CONNECTIONS_PER_IMPORT, 1)
+    return max(min(workers, budget, job_count), 1)
+
+
+def run_import_job(job: dict) -> ImportResult:
+    """Import then validate one version, `job` holds `importer_cls` arguments
+    and `validate` (default True)
+
+    Errors are returned in the result, not raised.
+    """
+    job = dict(job)
+    validate = job.pop("validate", True)
+    importer = None
+    load_seconds = validate_seconds = 0.0
+    start = time.perf_counter()
+    try:
+        importer = importer_cls(**job, with_themes=False)
+        importer.import_data()
+        load_seconds = time.perf_counter() - start
+        if validate:
+            importer.validate_data()
+            validate_seconds = time.perf_counter() - start - load_seconds
+        error = None
+    except Exception as err:
+        logger.exception("Import of %s failed", job.get("version"))
+        error = f"{type(err).__name__}: {err}"
+        if not load_seconds:
+            load_seconds = time.perf_counter() - start
+        else:
+            validate_seconds = time.perf_counter() - start - load_seconds
+    finally:
+        if importer:
+            importer.db.close()
+    return ImportResult(
+        job.get("version"),
+        importer.bible_id if importer else None,
+        error,
+        round(load_seconds, 3),
+        round(validate_seconds, 3),
+    )
+
+
+def _run_in_worker(job: dict) -> ImportResult:
+    try:
+        return run_import_job(job)
+    finally:
+        # worker engine, not shared with other processes
+        engine.dispose()
+
+
+def import_versions(jobs: List[dict], workers: Optional[int] = None):
+    """Import versions concurrently, each one in a worker process with its own
+    engine, then compile themes once
+
+    Returns:
+        list: ImportResult of each job, in jobs order
+    """
+    workers = workers or import_workers(len(jobs))
+    logger.info("Importing %s versions with %s workers", len(jobs), workers)
+    start = time.perf_counter()
+    if workers == 1:
+        results = [run_import_job(job) for job in jobs]
+    else:
+        results = [None] * len(jobs)
+        # spawned workers start with a fresh engine, without inherited sockets
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(_run_in_worker, job): i for i, job in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as err:  # worker died
+                    results[i] = ImportResult(
+                        jobs[i].get("version"), None, repr(err), 0.0, 0.0
+                    )
+
+    db = SessionLocal()
+    try:
+        compile_themes(db)
+    finally:
+        db.close()
+
+    for r in results:
+        logger.info(
+            "%s %s : load %.1fs, validation %.1fs%s",
+            r.version,
+            "OK" if r.ok else "FAILED",
+            r.load_seconds,
+            r.validate_seconds,
+            f" ({r.error})" if r.error else "",
+        )
+    logger.info(
+        "%s/%s versions imported in %.1fs",
+        sum(r.ok for r in results),
+        len(results),
+        time.perf_counter() - start,
+    )
+    return results
@@ -0,0 +1,95 @@
+import logging
+from typing import Iterable
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session, contains_eager, selectinload, undefer
+
+from app.models.bible import Book, Chapter, ChapterPayload
+from app.schemas.bible import ChapterItemNoVerses, VerseItem, dump_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def chapter_payload(chapter: Chapter) -> dict:
+    """Chapter header and verses rendered as get_chapter responds"""
+    header = ChapterItemNoVerses.model_validate(chapter).model_dump(mode="json")
+    verses = [
+        VerseItem.model_validate(v).model_dump(mode="json") for v in chapter.verses
+    ]
+    return {
+        "chapter_id": chapter.id,
+        "code": chapter.code,
+        "verse_count": len(verses),
+        "header": dump_json(header),
+        "verses": dump_json(verses),
+    }
+
+
+def store_payloads(db: Session, bible_id: int, force: bool = False) -> int:
+    """Render JSON of all chapters of one bible, one book at a time
+
+    Payloads must be rendered again (`force`) when chapter or verse schemas
+    change.
+
+    Args:
+        force (bool): render again even if bible already has payloads
+
+    Returns:
+        int: number of rendered chapters
+    """
+    stored = db.query(ChapterPayload.id).filter(ChapterPayload.bible_id == bible_id)
+    if stored.first() and not force:
+        return 0
+
+    db.execute(delete(ChapterPayload).where(ChapterPayload.bible_id == bible_id))
+    count = 0
+    book_ids = [
+        book_id
+        for book_id, in db.query(Book.id)
+        .filter(Book.bible_id == bible_id)
+        .order_by(Book.rank)
+    ]
+    for book_id in book_ids:
+        count += _insert_payloads(db, bible_id, Chapter.book_id == book_id)
+    db.commit()
+    logger.info("Bible %s : %s chapter payloads stored", bible_id, count)
+    return count
+
+
+def refresh_payloads(
+    db: Session, bible_id: int, chapter_ids: Iterable[int], batch_size: int = 100
+) -> int:
+    """Render JSON of some chapters again, after they are updated
+
+    Returns:
+        int: number of rendered chapters
+    """
+    chapter_ids = sorted(chapter_ids)
+    count = 0
+    for i in range(0, len(chapter_ids), batch_size):
+        batch = chapter_ids[i : i + batch_size]
+        db.execute(delete(ChapterPayload).where(ChapterPayload.chapter_id.in_(batch)))
+        count += _insert_payloads(db, bible_id, Chapter.id.in_(batch))
+    db.commit()
+    if count:
+        logger.info("Bible %s : %s chapter payloads refreshed", bible_id, count)
+    return count
+
+
+def _insert_payloads(db: Session, bible_id: int, criterion) -> int:
+    chapters = (
+        db.query(Chapter)
+        .join(Book, Chapter.book_id == Book.id)
+        .filter(criterion)
+        .options(
+            contains_eager(Chapter.book),
+            selectinload(Chapter.verses),
+            undefer(Chapter.verse_count),
+        )
+        .all()
+    )
+    rows = [dict(chapter_payload(c), bible_id=bible_id) for c in chapters]
+    if rows:
+        db.execute(insert(ChapterPayload), rows)
+    return len(rows)
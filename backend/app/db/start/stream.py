@@ -0,0 +1,165 @@
+import json
+from typing import IO, Any, Iterator, Tuple
+
+from app.schemas.bible import BibleItem, BookItem, ChapterItem
+
+# ("bible", BibleItem without books), ("book", BookItem without chapters) or
+# ("chapter", ChapterItem of the last book)
+BibleEvent = Tuple[str, Any]
+
+BOOK_REQUIRED_FIELDS = ("rank", "name")
+
+NUMBER_CHARS = frozenset("-+.0123456789eE")
+
+
+class JsonStream:
+    """Incremental JSON reader over a text file, values are decoded one at a
+    time from a buffer refilled by chunks
+
+    Arrays and objects are walked with `items` and `members`, each element or
+    member value must be consumed (`value`, or walked) before the next one.
+    """
+
+    def __init__(self, f: IO[str], chunk_size: int = 1 << 16) -> None:
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non blank character"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Next value fully decoded"""
+        if self.peek() in NUMBER_CHARS:
+            # a number may go on in the next chunk
+            length = 0
+            while True:
+                while (
+                    self.pos + length < len(self.buf)
+                    and self.buf[self.pos + length] in NUMBER_CHARS
+                ):
+                    length += 1
+                if self.pos + length < len(self.buf) or not self._fill():
+                    break
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buf, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def items(self) -> Iterator[None]:
+        """Walk an array, stopping before each element"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("]")
+                return
+
+    def members(self) -> Iterator[str]:
+        """Walk an object, yield each key and stop before its value"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+
+def json_bible_events(f: IO[str], chunk_size: int = 1 << 16) -> Iterator[BibleEvent]:
+    """Bible of a <BibleItem> json file read as a stream of books and chapters,
+    one chapter in memory at a time
+
+    Bible fields are expected before `books`, book fields before `chapters`
+    (as exported). Chapters of a book written before its name or rank are kept
+    until the end of the book.
+
+    Raises:
+        ValueError: on a bible or book field after books or chapters are read
+    """
+    stream = JsonStream(f, chunk_size)
+    header = {}
+    bible_sent = False
+    for key in stream.members():
+        if key != "books":
+            if bible_sent:
+                raise ValueError(f"Bible field {key} found after books")
+            header[key] = stream.value()
+            continue
+        yield "bible", BibleItem.model_validate({**header, "books": []})
+        bible_sent = True
+        for _ in stream.items():
+            yield from _book_events(stream)
+    if not bible_sent:
+        yield "bible", BibleItem.model_validate({**header, "books": []})
+
+
+def _book_events(stream: JsonStream) -> Iterator[BibleEvent]:
+    fields = {}
+    book_sent = False
+    pending = []  # chapters read before book fields
+    for key in stream.members():
+        if key != "chapters":
+            if book_sent:
+                raise ValueError(
+                    f"Book field {key} found after chapters of {fields.get('name')}"
+                )
+            fields[key] = stream.value()
+        elif all(f in fields for f in BOOK_REQUIRED_FIELDS):
+            yield "book", BookItem.model_validate(fields)
+            book_sent = True
+            for _ in stream.items():
+                yield "chapter", ChapterItem.model_validate(stream.value())
+        else:
+            pending = stream.value()
+    if not book_sent:
+        yield "book", BookItem.model_validate(fields)
+        for chapter in pending:
+            yield "chapter", ChapterItem.model_validate(chapter)
+
+
+def bible_item_events(bible_item: BibleItem) -> Iterator[BibleEvent]:
+    """Events of a bible parsed at once, as `json_bible_events` gives"""
+    yield "bible", bible_item.model_copy(update={"books": []})
+    for book in bible_item.books or []:
+        yield "book", book.model_copy(update={"chapters": []})
+        for chapter in book.chapters:
+            yield "chapter", chapter
@@ -0,0 +1,129 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.index import book_resolver, theme_tree, verse_map
+from app.index.books import BookResolver, book_key
+from app.index.coordinates import VerseMap
+from app.index.references import parse_bible_ref, range_bounds, verse_intervals
+from app.models.bible import Theme, ThemeInterval, ThemeReference
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def resolve_book_rank(
+    resolvers: List[BookResolver], identifier: Optional[str]
+) -> Optional[int]:
+    """Rank of a book known by any version, exact identifiers first"""
+    key = book_key(identifier)
+    if not key:
+        return None
+    for resolver in resolvers:
+        rank = resolver.keys.get(key)
+        if rank is not None:
+            return rank
+    for resolver in resolvers:
+        book = resolver.resolve(identifier)
+        if book:
+            return book.rank
+    return None
+
+
+def compile_references(
+    references: Optional[str],
+    resolvers: List[BookResolver],
+    verse_maps: Dict[int, VerseMap],
+) -> Tuple[List[ThemeReference], List[str]]:
+    """Theme references and their rank_all intervals in every version
+
+    References are split as `search_references` does, e.g 'Rev.5:1,4-5' gives
+    'Rev. 5:1' and 'Rev. 5:4-5'.
+
+    Returns:
+        tuple: references, labels of invalid ones (unknown book, bad range or
+        no verse in any version)
+    """
+    parts, invalid = [], []
+    for ref in parse_bible_ref(references):
+        book_name = ref["book"]
+        chapter = ref["chapter"]
+        book_rank = resolve_book_rank(resolvers, book_name)
+        chapter_bounds = range_bounds(chapter) if chapter else None
+
+        for verse in ref["verses"] or [None]:  # None : whole chapter
+            location = f"{chapter}" if verse is None else f"{chapter}:{verse}"
+            verse_bounds = range_bounds(verse) if verse else None
+            part = ThemeReference(
+                position=len(parts),
+                book=book_name,
+                location=location,
+                book_rank=book_rank,
+                chapter=chapter_bounds[0] if chapter_bounds else None,
+                to_chapter=chapter_bounds[1] if chapter_bounds else None,
+                from_verse=verse_bounds[0] if verse_bounds else None,
+                to_verse=verse_bounds[1] if verse_bounds else None,
+            )
+            if book_rank is not None:
+                for bible_id, vmap in verse_maps.items():
+                    part.intervals.extend(
+                        ThemeInterval(
+                            bible_id=bible_id, first_rank=first, last_rank=last
+                        )
+                        for first, last in verse_intervals(
+                            vmap, book_rank, chapter, verse
+                        )
+                    )
+            if not part.intervals:
+                invalid.append(f"{book_name} {location}")
+            parts.append(part)
+    return parts, invalid
+
+
+def _indexes(db: Session) -> Tuple[List[BookResolver], Dict[int, VerseMap]]:
+    """Book resolvers and verse maps of all versions, in bible id order"""
+    bible_ids = [bible.id for bible in crud.bible.get_multi(db)]
+    return (
+        [book_resolver.get(db, bible_id) for bible_id in bible_ids],
+        {bible_id: verse_map.get(db, bible_id) for bible_id in bible_ids},
+    )
+
+
+def compile_theme(db: Session, theme: Theme, indexes=None) -> List[str]:
+    """Replace compiled references of a theme, not committed
+
+    Returns:
+        list: labels of invalid references
+    """
+    resolvers, verse_maps = indexes or _indexes(db)
+    theme.reference_parts, invalid = compile_references(
+        theme.references, resolvers, verse_maps
+    )
+    theme.compiled_references = theme.references
+    return invalid
+
+
+def compile_themes(db: Session) -> int:
+    """Compile references of all themes again, after a bible import
+
+    Themes are written outside of the app, their references are only checked
+    here: invalid ones are kept (they may match a version imported later) and
+    logged.
+
+    Returns:
+        int: number of compiled themes
+    """
+    indexes = _indexes(db)
+    themes = db.query(Theme).order_by(Theme.id).all()
+    for theme in themes:
+        invalid = compile_theme(db, theme, indexes)
+        if invalid:
+            logger.warning(
+                "Theme %s, invalid references : %s", theme.id, "; ".join(invalid)
+            )
+    db.commit()
+    theme_tree.invalidate()
+    logger.info("%s themes compiled", len(themes))
+    return len(themes)
@@ -0,0 +1,329 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.orm import Session
+
+from app.db.start.constants import BOOK_CODES
+from app.db.start.loader import (
+    IdAllocator,
+    book_row,
+    chapter_hash,
+    chapter_row,
+    chapter_verses,
+    verse_key,
+)
+from app.db.start.stream import BibleEvent
+from app.models.bible import Bible, Book, Chapter, Verse
+from app.schemas.bible import BibleItem, BookItem, ChapterItem
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BIBLE_FIELDS = ("description", "comment", "year", "src", "src_url")
+BOOK_FIELDS = ("name", "short_name", "code", "classification", "category")
+
+
+class StoredChapter(NamedTuple):
+    id: int
+    book_id: int
+    content_hash: Optional[str]
+    first_rank_all: Optional[int]
+
+
+class VersionDiff(NamedTuple):
+    """Changes written by update_version"""
+
+    bible: List[str]  # updated bible fields
+    books: Dict[str, int]  # added, updated, deleted
+    chapters: Dict[str, int]  # added, updated, deleted, shifted (rank_all)
+    verses: Dict[str, List[str]]  # codes of added, updated, deleted verses
+    chapter_ids: Set[int]  # chapters to render again
+    book_ids: Set[int]  # books to align again
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.bible or self.chapter_ids or self.book_ids) or any(
+            self.books.values()
+        )
+
+    def summary(self) -> str:
+        verses = {kind: len(codes) for kind, codes in self.verses.items()}
+        return "books %s | chapters %s | verses %s" % (
+            _counts(self.books),
+            _counts(self.chapters),
+            _counts(verses),
+        )
+
+
+def _counts(counts: Dict[str, int]) -> str:
+    return ", ".join(f"{n} {kind}" for kind, n in counts.items() if n) or "unchanged"
+
+
+def diff_verses(
+    stored: List[dict], rows: List[dict]
+) -> Tuple[List[dict], List[dict], List[dict], List[dict]]:
+    """Match verses of one chapter by rank, in order for repeated ranks
+
+    Args:
+        stored (list): verse rows in db, with `id`
+        rows (list): imported verse rows (see chapter_verses)
+
+    Returns:
+        tuple: rows to insert, rows to update with stored `id` (content
+        changed, then `rank_all` moved only), stored rows to delete
+    """
+    by_rank = defaultdict(list)
+    for row in stored:
+        by_rank[row["rank"]].append(row)
+    inserts, updates, moves = [], [], []
+    for row in rows:
+        matches = by_rank.get(row["rank"])
+        if not matches:
+            inserts.append(row)
+            continue
+        old = matches.pop(0)
+        if verse_key(old) != verse_key(row):
+            updates.append(dict(row, id=old["id"]))
+        elif old["rank_all"] != row["rank_all"]:
+            moves.append(dict(row, id=old["id"]))
+    deletes = [row for matches in by_rank.values() for row in matches]
+    return inserts, updates, moves, deletes
+
+
+class VersionUpdater:
+    """Existing version updated from a stream of events (see json_bible_events)
+    with the rows that changed only, in the transaction of `db`
+
+    Verses are compared only in chapters whose hash changed (or was never
+    computed). Matched verses keep their id, `rank_all` is counted as a full
+    import does and written where it moved.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        bible_id: int,
+        ts_config: str,
+        book_codes: dict = BOOK_CODES,
+        batch_size: int = 100,
+    ) -> None:
+        self.db = db
+        self.bible_id = bible_id
+        self.ts_config = ts_config
+        self.book_codes = book_codes
+        self.batch_size = batch_size  # changed chapters compared at once
+        self.rank_all = 1
+        self.diff = VersionDiff(
+            [],
+            dict.fromkeys(("added", "updated", "deleted"), 0),
+            dict.fromkeys(("added", "updated", "deleted", "shifted"), 0),
+            {"added": [], "updated": [], "deleted": []},
+            set(),
+            set(),
+        )
+        self._books = self._stored_books()
+        self._chapters = self._stored_chapters()
+        self._seen_books: Set[int] = set()
+        self._seen_chapters: Set[int] = set()
+        self._pending: List[Tuple[dict, List[dict]]] = []  # changed chapters
+        self._shifts: Dict[int, List[int]] = defaultdict(list)  # delta: chapters
+        self._chapter_ids = IdAllocator(db, Chapter.__tablename__, 100)
+
+    def _stored_books(self) -> Dict[int, dict]:
+        books = self.db.query(
+            Book.id, Book.rank, *(getattr(Book, f) for f in BOOK_FIELDS)
+        ).filter(Book.bible_id == self.bible_id)
+        return {row.rank: row._asdict() for row in books}
+
+    def _stored_chapters(self) -> Dict[Tuple[int, int], StoredChapter]:
+        rows = (
+            self.db.query(
+                Book.rank,
+                Chapter.rank,
+                Chapter.id,
+                Chapter.book_id,
+                Chapter.content_hash,
+                func.min(Verse.rank_all),
+            )
+            .join(Book, Chapter.book_id == Book.id)
+            .outerjoin(Verse, Verse.chapter_id == Chapter.id)
+            .filter(Book.bible_id == self.bible_id)
+            .group_by(Book.rank, Chapter.id)
+        )
+        return {
+            (book_rank, chapter_rank): StoredChapter(*stored)
+            for book_rank, chapter_rank, *stored in rows
+        }
+
+    def update_bible(self, item: BibleItem):
+        bible = self.db.get(Bible, self.bible_id)
+        for field in BIBLE_FIELDS:
+            value = getattr(item, field)
+            if getattr(bible, field) != value:
+                setattr(bible, field, value)
+                self.diff.bible.append(field)
+
+    def update_book(self, b: BookItem) -> dict:
+        row = book_row(b, self.bible_id, self.book_codes)
+        stored = self._books.get(b.rank)
+        if stored is None:
+            row["id"] = self.db.execute(insert(Book).returning(Book.id), row).scalar()
+            self.diff.books["added"] += 1
+        else:
+            row["id"] = stored["id"]
+            changes = {f: row.get(f) for f in BOOK_FIELDS if row.get(f) != stored[f]}
+            if changes:
+                self.db.execute(
+                    update(Book).where(Book.id == row["id"]).values(**changes)
+                )
+                self.diff.books["updated"] += 1
+                # book is in chapter payloads
+                self.diff.chapter_ids.update(
+                    c.id for c in self._chapters.values() if c.book_id == row["id"]
+                )
+                if "code" in changes:  # canonical book of alignments
+                    self.diff.book_ids.add(row["id"])
+        self._seen_books.add(row["id"])
+        return row
+
+    def update_chapter(self, book: dict, chap: ChapterItem):
+        stored = self._chapters.get((book["rank"], chap.rank))
+        chapter = chapter_row(chap, book["id"], book["code"])
+        chapter["id"] = stored.id if stored else self._chapter_ids.next()
+        rows = chapter_verses(
+            chap, chapter["id"], book["code"], self.rank_all, self.ts_config
+        )
+        chapter["content_hash"] = chapter_hash(chapter["code"], rows)
+        self.rank_all += len(rows)
+        self._seen_chapters.add(chapter["id"])
+
+        if stored is None:
+            self.db.execute(insert(Chapter), [chapter])
+            if rows:
+                self.db.execute(insert(Verse), rows)
+            self.diff.chapters["added"] += 1
+            self.diff.verses["added"].extend(r["code"] for r in rows)
+            self.diff.chapter_ids.add(chapter["id"])
+            self.diff.book_ids.add(book["id"])
+        elif stored.content_hash != chapter["content_hash"]:
+            self._pending.append((chapter, rows))
+            if len(self._pending) >= self.batch_size:
+                self._compare_pending()
+        elif rows and stored.first_rank_all != rows[0]["rank_all"]:
+            delta = rows[0]["rank_all"] - stored.first_rank_all
+            self._shifts[delta].append(stored.id)
+            self.diff.chapters["shifted"] += 1
+            self.diff.chapter_ids.add(stored.id)
+
+    def _compare_pending(self):
+        """Verses of changed chapters compared with stored ones"""
+        if not self._pending:
+            return
+        stored = defaultdict(list)
+        rows = self.db.query(
+            Verse.id,
+            Verse.chapter_id,
+            Verse.rank,
+            Verse.rank_all,
+            Verse.code,
+            Verse.subtitle,
+            Verse.content,
+            Verse.refs,
+        ).filter(Verse.chapter_id.in_([c["id"] for c, _ in self._pending]))
+        for row in rows:
+            stored[row.chapter_id].append(row._asdict())
+
+        # hash saved even if verses are the same (chapter imported before hashes)
+        self.db.execute(
+            update(Chapter),
+            [
+                {"id": c["id"], "code": c["code"], "content_hash": c["content_hash"]}
+                for c, _ in self._pending
+            ],
+        )
+        for chapter, verses in self._pending:
+            inserts, updates, moves, deletes = diff_verses(
+                stored[chapter["id"]], verses
+            )
+            if inserts:
+                self.db.execute(insert(Verse), inserts)
+            if updates or moves:
+                self.db.execute(update(Verse), updates + moves)
+            if deletes:
+                self.db.execute(
+                    delete(Verse).where(Verse.id.in_([r["id"] for r in deletes]))
+                )
+            self.diff.verses["added"].extend(r["code"] for r in inserts)
+            self.diff.verses["updated"].extend(r["code"] for r in updates)
+            self.diff.verses["deleted"].extend(r["code"] for r in deletes)
+            if updates or deletes or inserts:
+                self.diff.chapters["updated"] += 1
+            if updates or moves or deletes or inserts:
+                self.diff.chapter_ids.add(chapter["id"])
+            if inserts or deletes:
+                self.diff.book_ids.add(chapter["book_id"])
+        self._pending = []
+
+    def finish(self) -> VersionDiff:
+        """Write remaining changes, drop books and chapters not imported again"""
+        self._compare_pending()
+        for delta, chapter_ids in self._shifts.items():
+            self.db.execute(
+                update(Verse)
+                .where(Verse.chapter_id.in_(chapter_ids))
+                .values(rank_all=Verse.rank_all + delta)
+            )
+
+        book_ids = [
+            b["id"] for b in self._books.values() if b["id"] not in self._seen_books
+        ]
+        chapters = [
+            c for c in self._chapters.values() if c.id not in self._seen_chapters
+        ]
+        if chapters:
+            self.diff.verses["deleted"].extend(
+                code
+                for code, in self.db.query(Verse.code)
+                .filter(Verse.chapter_id.in_([c.id for c in chapters]))
+                .order_by(Verse.rank_all)
+            )
+            chapters = [c for c in chapters if c.book_id not in book_ids]
+            self.db.execute(
+                delete(Chapter).where(Chapter.id.in_([c.id for c in chapters]))
+            )
+            self.diff.chapters["deleted"] += len(chapters)
+            self.diff.book_ids.update(c.book_id for c in chapters)
+        if book_ids:
+            # chapters, verses and their payloads go with them
+            self.db.execute(delete(Book).where(Book.id.in_(book_ids)))
+            self.diff.books["deleted"] += len(book_ids)
+        return self.diff
+
+
+def update_version(
+    db: Session,
+    bible_id: int,
+    events: Iterable[BibleEvent],
+    ts_config: str,
+    book_codes: dict = BOOK_CODES,
+) -> VersionDiff:
+    """Apply a new import of an existing version as a diff, in one transaction
+
+    Returns:
+        VersionDiff: written changes
+    """
+    updater = VersionUpdater(db, bible_id, ts_config, book_codes)
+    book = None
+    for kind, item in events:
+        if kind == "bible":
+            updater.update_bible(item)
+        elif kind == "book":
+            book = updater.update_book(item)
+        else:
+            updater.update_chapter(book, item)
+    diff = updater.finish()
+    db.commit()
+    logger.info("Bible %s updated : %s", bible_id, diff.summary())
+    return diff
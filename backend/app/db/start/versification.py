@@ -0,0 +1,109 @@
+import logging
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.start.constants import BOOK_CODES
+from app.models.bible import Alignment, Book, Chapter, Verse
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# canonical book number from book code, books without code keep their rank
+CANON_BOOKS = {code: rank for rank, code in BOOK_CODES.items()}
+
+# Chapter splits differing from english versification (KJV), used as canonical.
+# book number: (chapter count of the differing split,
+#   [(chapter, from verse, to verse, canonical chapter, canonical from verse)])
+VERSIFICATION_SPLITS = {
+    29: (4, [(3, 1, 5, 2, 28), (4, 1, 21, 3, 1)]),  # Joel (fr, mg)
+    39: (3, [(3, 19, 24, 4, 1)]),  # Malachi (fr, mg)
+}
+
+
+def canonical_id(book: int, chapter: int, verse: int) -> int:
+    """Canonical verse id, e.g Gen 1:1 -> 1001001"""
+    return book * 1_000_000 + chapter * 1_000 + verse
+
+
+def canonical_ids(rows):
+    """Canonical id of verses of one bible
+
+    Args:
+        rows (list): (verse id, book code, book rank, chapter rank, verse rank)
+
+    Returns:
+        list: (verse id, canonical id)
+    """
+    chapters = defaultdict(set)
+    for _, _, book_rank, chapter_rank, _ in rows:
+        chapters[book_rank].add(chapter_rank)
+
+    res = []
+    for verse_id, code, book_rank, chapter_rank, verse_rank in rows:
+        book = CANON_BOOKS.get(code, book_rank)
+        chapter, verse = chapter_rank, verse_rank
+        split = VERSIFICATION_SPLITS.get(book)
+        if split and len(chapters[book_rank]) == split[0]:
+            for ch, first, last, canon_chapter, canon_first in split[1]:
+                if chapter_rank == ch and first <= verse_rank <= last:
+                    chapter = canon_chapter
+                    verse = canon_first + verse_rank - first
+                    break
+        res.append((verse_id, canonical_id(book, chapter, verse)))
+    return res
+
+
+def align_verses(
+    db: Session,
+    bible_id: int,
+    force: bool = False,
+    book_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """Fill alignment table for all verses of one bible
+
+    Args:
+        force (bool): rebuild even if bible is already aligned
+        book_ids (list): rebuild these books only (implies force)
+
+    Returns:
+        int: number of aligned verses
+    """
+    aligned = db.query(Alignment.id).filter(Alignment.bible_id == bible_id)
+    if book_ids is None and aligned.first() and not force:
+        return 0
+
+    rows = (
+        db.query(Verse.id, Book.code, Book.rank, Chapter.rank, Verse.rank)
+        .join(Chapter, Verse.chapter_id == Chapter.id)
+        .join(Book, Chapter.book_id == Book.id)
+        .filter(Book.bible_id == bible_id)
+    )
+    if book_ids is None:
+        db.execute(delete(Alignment).where(Alignment.bible_id == bible_id))
+    else:
+        # chapter splits are checked on whole books
+        rows = rows.filter(Book.id.in_(list(book_ids)))
+        db.execute(
+            delete(Alignment).where(
+                Alignment.verse_id.in_(
+                    select(Verse.id)
+                    .join(Chapter, Verse.chapter_id == Chapter.id)
+                    .where(Chapter.book_id.in_(list(book_ids)))
+                )
+            )
+        )
+    rows = rows.all()
+    if rows:
+        db.execute(
+            insert(Alignment),
+            [
+                {"bible_id": bible_id, "verse_id": verse_id, "canon_id": canon_id}
+                for verse_id, canon_id in canonical_ids(rows)
+            ],
+        )
+    db.commit()
+    logger.info("Bible %s : %s verses aligned", bible_id, len(rows))
+    return len(rows)
@@ -0,0 +1,6 @@
+from .base import invalidate_indexes  # noqa
+from .books import book_resolver  # noqa
+from .coordinates import verse_map  # noqa
+from .text import text_index  # noqa
+from .themes import theme_tree  # noqa
+from .versions import version_registry  # noqa
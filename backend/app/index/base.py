@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud
+
+logger = logging.getLogger(__name__)
+
+IndexType = TypeVar("IndexType")
+
+# every per bible cache, to drop them all when a bible changes
+# (any object with an `invalidate(bible_id)` method)
+registries: list = []
+
+
+class _Build:
+    """Index being built, other callers wait for it: sync ones on `done`,
+    async ones on a future of their event loop"""
+
+    def __init__(self, generation: int) -> None:
+        self.generation = generation
+        self.done = threading.Event()
+        self.futures: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def finish(self):
+        self.done.set()
+        for loop, future in self.futures:
+            loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class BibleIndexes(Generic[IndexType]):
+    """Process wide cache of one index per bible version, built on demand
+
+    One build at a time per bible, concurrent first lookups wait for it.
+    Async callers wait on a future, not on the lock: an async session waiting
+    on db lets another request run in the same thread, blocking it would
+    never let the build resume.
+    """
+
+    def __init__(self) -> None:
+        self._indexes: Dict[int, IndexType] = {}
+        self._building: Dict[int, _Build] = {}
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped on invalidation
+        registries.append(self)
+
+    def build(self, db: Session, bible_id: int) -> IndexType:
+        raise NotImplementedError
+
+    def get(self, db: Session, bible_id: int) -> IndexType:
+        while True:
+            index, build, owner = self._claim(bible_id)
+            if index is not None:
+                return index
+            if owner:
+                return self._build(db, bible_id, build)
+            # built, failed or dropped by another caller, look again
+            build.done.wait()
+
+    async def aget(self, db: AsyncSession, bible_id: int) -> IndexType:
+        """Index from an async session, queries only to build a missing one"""
+        while True:
+            index = self._indexes.get(bible_id)
+            if index is not None:
+                return index
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            index, build, owner = self._claim(bible_id, (loop, future))
+            if index is not None:
+                return index
+            if owner:
+                return await db.run_sync(self._build, bible_id, build)
+            await future
+
+    def _claim(self, bible_id: int, waiter=None) -> Tuple[IndexType, _Build, bool]:
+        """Index if built, else the build in progress (waited by `waiter`),
+        or a new one owned by the caller"""
+        with self._lock:
+            index = self._indexes.get(bible_id)
+            if index is not None:
+                return index, None, False
+            build = self._building.get(bible_id)
+            if build is None:
+                build = self._building[bible_id] = _Build(self._generation)
+                return None, build, True
+            if waiter:
+                build.futures.append(waiter)
+            return None, build, False
+
+    def _build(self, db: Session, bible_id: int, build: _Build) -> IndexType:
+        index = None
+        try:
+            index = self.build(db, bible_id)
+        finally:
+            with self._lock:
+                # not kept if bible changed while building
+                if index is not None and build.generation == self._generation:
+                    self._indexes[bible_id] = index
+                if self._building.get(bible_id) is build:
+                    del self._building[bible_id]
+            build.finish()
+        return index
+
+    def preload(self, db: Session):
+        """Build indexes of all bible versions in db"""
+        for bible in crud.bible.get_multi(db):
+            self.get(db, bible.id)
+
+    def invalidate(self, bible_id: Optional[int] = None):
+        """Drop index of one bible, or all of them
+
+        Builds in progress are left to finish, the next lookups build again.
+        """
+        with self._lock:
+            self._generation += 1
+            if bible_id is None:
+                self._indexes.clear()
+                self._building.clear()
+            else:
+                self._indexes.pop(bible_id, None)
+                self._building.pop(bible_id, None)
+
+
+def invalidate_indexes(bible_id: Optional[int] = None):
+    """Drop every cached index of one bible, or of all bibles"""
+    for registry in registries:
+        registry.invalidate(bible_id)
@@ -0,0 +1,169 @@
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.index.base import BibleIndexes
+from app.index.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+IGNORED_CHARS = re.compile(r"[\s.]+")
+
+# shortest identifier tried as an unambiguous name prefix or fuzzy matched
+MIN_PREFIX_LENGTH = 3
+MIN_FUZZY_LENGTH = 4
+
+
+class BookInfo(NamedTuple):
+    id: int
+    rank: int
+    code: Optional[str]
+    name: str
+
+
+def book_key(identifier: Optional[str]) -> str:
+    """Lookup key of a book identifier, e.g 'Apôkalypsy ' -> 'apokalypsy'"""
+    return IGNORED_CHARS.sub("", normalize_text(identifier))
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree, finds words within an edit distance"""
+
+    def __init__(self) -> None:
+        self.root: Optional[Tuple[str, dict]] = None
+
+    def add(self, word: str):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node_word, children = self.root
+        while True:
+            dist = edit_distance(word, node_word)
+            if dist == 0:
+                return
+            if dist not in children:
+                children[dist] = (word, {})
+                return
+            node_word, children = children[dist]
+
+    def search(self, word: str, max_dist: int) -> List[Tuple[int, str]]:
+        """(distance, word) of words at most max_dist away, closest first"""
+        res = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_word, children = stack.pop()
+            dist = edit_distance(word, node_word)
+            if dist <= max_dist:
+                res.append((dist, node_word))
+            for d in range(dist - max_dist, dist + max_dist + 1):
+                if d in children:
+                    stack.append(children[d])
+        return sorted(res)
+
+
+class BookResolver:
+    """Book of one bible version from any user given identifier
+
+    Names, short names and codes of the version are resolved first, then those
+    of other versions in the same language, then unambiguous name prefixes
+    (e.g 'Apok'), all accent and case insensitive. Typos fall back on the
+    closest known identifier.
+    """
+
+    def __init__(self, bible_id: int, rows) -> None:
+        """rows: (bible id, book id, rank, code, name, short_name) of all books
+        in the language of the bible"""
+        self.bible_id = bible_id
+        self.books: Dict[int, BookInfo] = {}
+        self.keys: Dict[str, int] = {}  # lookup key -> book rank
+        lang_keys: Dict[str, int] = {}
+        prefixes = defaultdict(set)
+
+        for bid, book_id, rank, code, name, short_name in sorted(
+            rows, key=lambda r: (r[0] != bible_id, r[2])
+        ):
+            own = bid == bible_id
+            if own:
+                self.books.setdefault(rank, BookInfo(book_id, rank, code, name))
+            identifiers = [name, short_name, code]
+            if code:
+                identifiers.append(code.rstrip("_"))
+            for identifier in identifiers:
+                key = book_key(identifier)
+                if key:
+                    (self.keys if own else lang_keys).setdefault(key, rank)
+            for identifier in (name, short_name):
+                key = book_key(identifier)
+                for i in range(MIN_PREFIX_LENGTH, len(key)):
+                    prefixes[key[:i]].add(rank)
+
+        for key, rank in lang_keys.items():
+            self.keys.setdefault(key, rank)
+        for key, ranks in prefixes.items():
+            if len(ranks) == 1:
+                self.keys.setdefault(key, ranks.pop())
+        # identifiers of books missing in this version are useless
+        self.keys = {k: r for k, r in self.keys.items() if r in self.books}
+
+        self.tree = BKTree()
+        for key in self.keys:
+            if len(key) >= MIN_FUZZY_LENGTH:
+                self.tree.add(key)
+
+    def __len__(self):
+        return len(self.books)
+
+    def resolve(self, identifier: Optional[str]) -> Optional[BookInfo]:
+        key = book_key(identifier)
+        if not key:
+            return None
+        rank = self.keys.get(key)
+        if rank is None and len(key) >= MIN_FUZZY_LENGTH:
+            rank = self._closest(key)
+        return self.books.get(rank) if rank is not None else None
+
+    def _closest(self, key: str) -> Optional[int]:
+        """Rank of the closest identifier, None if too far or ambiguous"""
+        matches = self.tree.search(key, 1 if len(key) < 8 else 2)
+        if not matches:
+            return None
+        best = matches[0][0]
+        ranks = {self.keys[w] for d, w in matches if d == best}
+        return ranks.pop() if len(ranks) == 1 else None
+
+
+class BookResolvers(BibleIndexes[BookResolver]):
+    """Book resolvers of all bible versions"""
+
+    def build(self, db: Session, bible_id: int) -> BookResolver:
+        resolver = BookResolver(bible_id, crud.book.query_identifiers(db, bible_id))
+        logger.info(
+            "Book resolver built for bible %s : %s books", bible_id, len(resolver)
+        )
+        return resolver
+
+    def invalidate(self, bible_id: Optional[int] = None):
+        # resolvers of a language share identifiers of all its versions
+        super().invalidate()
+
+
+book_resolver = BookResolvers()
@@ -0,0 +1,111 @@
+import bisect
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.index.base import BibleIndexes
+
+logger = logging.getLogger(__name__)
+
+Coordinate = Tuple[int, int, int]  # book rank, chapter rank, verse rank
+
+
+class VerseMap:
+    """Position of every verse of one bible version
+
+    Maps (book_rank, chapter_rank, verse_rank) to `rank_all` and back, so verse
+    ranges are resolved without querying db.
+    """
+
+    def __init__(self, bible_id: int, rows) -> None:
+        self.bible_id = bible_id
+        self.rank_all: Dict[Coordinate, int] = {}
+        self.coordinates: Dict[int, Coordinate] = {}
+        self.ranks: List[int] = []  # sorted rank_all
+        self.chapter_bounds: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self.book_bounds: Dict[int, Tuple[int, int]] = {}
+        self.last_chapters: Dict[int, int] = {}
+        # (verse rank, rank_all) of each chapter, sorted
+        self.chapter_verses: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+
+        for rank_all, book_rank, chapter_rank, verse_rank in rows:
+            coordinate = (book_rank, chapter_rank, verse_rank)
+            self.rank_all[coordinate] = rank_all
+            self.coordinates[rank_all] = coordinate
+            self.ranks.append(rank_all)
+            self._extend(self.chapter_bounds, (book_rank, chapter_rank), rank_all)
+            self.chapter_verses.setdefault((book_rank, chapter_rank), []).append(
+                (verse_rank, rank_all)
+            )
+            self._extend(self.book_bounds, book_rank, rank_all)
+            self.last_chapters[book_rank] = max(
+                chapter_rank, self.last_chapters.get(book_rank, chapter_rank)
+            )
+        self.ranks.sort()
+        for verses in self.chapter_verses.values():
+            verses.sort()
+
+    @staticmethod
+    def _extend(bounds: dict, key, rank_all: int):
+        first, last = bounds.get(key, (rank_all, rank_all))
+        bounds[key] = (min(first, rank_all), max(last, rank_all))
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def find(self, book_rank: int, chapter_rank: int, verse_rank: int) -> Optional[int]:
+        """rank_all of one verse, None if not found"""
+        return self.rank_all.get((book_rank, chapter_rank, verse_rank))
+
+    def find_range(
+        self, book_rank: int, chapter_rank: int, first: int, last: int
+    ) -> List[int]:
+        """rank_all of the verses of a chapter between two verse ranks"""
+        verses = self.chapter_verses.get((book_rank, chapter_rank), [])
+        start = bisect.bisect_left(verses, (first, -1))
+        end = bisect.bisect_right(verses, (last, float("inf")))
+        return [rank_all for _, rank_all in verses[start:end]]
+
+    def last_chapter(self, book_rank: int) -> Optional[int]:
+        """Rank of the last chapter in a book"""
+        return self.last_chapters.get(book_rank)
+
+    def last_verse(self, book_rank: int, chapter_rank: Optional[int] = None):
+        """rank_all of last verse in a chapter, or in the whole book"""
+        if chapter_rank:
+            bounds = self.chapter_bounds.get((book_rank, chapter_rank))
+        else:
+            bounds = self.book_bounds.get(book_rank)
+        return bounds[1] if bounds else None
+
+    def count(self, start: int, end: int) -> int:
+        """Number of verses between two rank_all (included)"""
+        return bisect.bisect_right(self.ranks, end) - bisect.bisect_left(
+            self.ranks, start
+        )
+
+    def previous(self, rank_all: int) -> Optional[int]:
+        """rank_all of the verse just before"""
+        i = bisect.bisect_left(self.ranks, rank_all)
+        return self.ranks[i - 1] if i > 0 else None
+
+    def next(self, rank_all: int) -> Optional[int]:
+        """rank_all of the verse just after"""
+        i = bisect.bisect_right(self.ranks, rank_all)
+        return self.ranks[i] if i < len(self.ranks) else None
+
+
+class VerseMaps(BibleIndexes[VerseMap]):
+    """Verse maps of all bible versions"""
+
+    def build(self, db: Session, bible_id: int) -> VerseMap:
+        verse_map = VerseMap(bible_id, crud.verse.query_coordinates(db, bible_id))
+        logger.info(
+            "Verse map built for bible %s : %s verses", bible_id, len(verse_map)
+        )
+        return verse_map
+
+
+verse_map = VerseMaps()
@@ -0,0 +1,101 @@
+import bisect
+import re
+from typing import List, Optional, Tuple
+
+from app.index.coordinates import VerseMap
+
+Interval = Tuple[int, int]  # first and last rank_all, included
+
+RANGE_SEPARATOR = re.compile(r"[-–]")
+
+
+def parse_bible_ref(references: str):
+    pattern = r"(?P<book>\d{0,1}\s?\w+)(\s|.)?((?P<chapter>\d+((–|-)\d+)?)((:|.)(?P<verse>(,?\d+((–|-)\d+)?)+))?)?"
+    res = []
+    parts = references.split(";") if references else []
+
+    last_book = None
+    for part in parts:
+        part = part.strip()
+        if part:
+            match = None
+            if not re.search(r"[a-zA-Z]", part) and last_book is not None:
+                part = f"{last_book} {part}"
+
+            for match in re.finditer(pattern, part):
+                book = match["book"].strip() if match["book"] else None
+                last_book = book
+                chapter = match["chapter"].strip() if match["chapter"] else None
+                verses = match["verse"].split(",") if match["verse"] else None
+                res.append(
+                    {
+                        "ref": part,
+                        "book": book,
+                        "chapter": chapter,
+                        "verses": verses,
+                    }
+                )
+
+    return res
+
+
+def range_bounds(text: str) -> Optional[Tuple[int, int]]:
+    """'4-5' -> (4, 5), '4' -> (4, 4), None if not a number or range"""
+    parts = [p.strip() for p in RANGE_SEPARATOR.split(text)]
+    if not 1 <= len(parts) <= 2 or not all(p.isdigit() for p in parts):
+        return None
+    return int(parts[0]), int(parts[-1])
+
+
+def verse_intervals(
+    verse_map: VerseMap, book_rank: int, chapters: str, verses: Optional[str]
+) -> List[Interval]:
+    """rank_all intervals of a reference part, e.g chapters "3", verses "4-7"
+
+    Without verses, whole chapters are selected. Verses missing in the version
+    are skipped, an empty list is returned if none exists.
+    """
+    chapter_bounds = range_bounds(chapters) if chapters else None
+    if not chapter_bounds:
+        return []
+
+    if verses is None:
+        first = last = None
+        # typed ranges may go far beyond the chapters of the book
+        last_chapter = verse_map.last_chapter(book_rank) or 0
+        for chapter in range(
+            chapter_bounds[0], min(chapter_bounds[1], last_chapter) + 1
+        ):
+            bounds = verse_map.chapter_bounds.get((book_rank, chapter))
+            if bounds:
+                first = bounds[0] if first is None else first
+                last = bounds[1]
+        return [(first, last)] if first is not None else []
+
+    verse_bounds = range_bounds(verses)
+    if not verse_bounds:
+        return []
+    found = verse_map.find_range(book_rank, chapter_bounds[0], *verse_bounds)
+    return [(min(found), max(found))] if found else []
+
+
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """Sorted union of intervals, overlapping or adjacent ones merged"""
+    merged: List[Interval] = []
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def split_verses(verses: list, intervals: List[Interval]) -> list:
+    """Verses (sorted by rank_all) falling in intervals, in rank_all order"""
+    ranks = [v.rank_all for v in verses]
+    res = []
+    for first, last in merge_intervals(intervals):
+        res.extend(
+            verses[bisect.bisect_left(ranks, first) : bisect.bisect_right(ranks, last)]
+        )
+    return res
@@ -0,0 +1,162 @@
+import logging
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.index.base import BibleIndexes
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+ORDER_RANK = "rank"
+ORDER_RELEVANCE = "relevance"
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase text without accents, e.g "l'Éternel" -> "l'eternel"
+
+    Used on stored verses and on searched text so both sides compare equal.
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def fold_verse_text(content: Optional[str], subtitle: Optional[str]) -> str:
+    """Normalized searchable text of a verse, subtitle first"""
+    return "\n".join(normalize_text(t) for t in (subtitle, content) if t)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a normalized text into word tokens"""
+    return TOKEN_PATTERN.findall(text)
+
+
+class TextIndex:
+    """Inverted index over all verses of one bible version
+
+    Documents are kept in `rank_all` order so hits can be returned in
+    canonical order without sorting. Matching is a substring search on
+    content and subtitle, insensitive to case and accents, ranking uses BM25.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, bible_id: int, rows) -> None:
+        self.bible_id = bible_id
+        self.ids: List[int] = []
+        self.book_ranks: List[int] = []
+        self.chapter_ranks: List[int] = []
+        self.texts: List[str] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+
+        for verse_id, content, subtitle, book_rank, chapter_rank in rows:
+            doc = len(self.ids)
+            text = fold_verse_text(content, subtitle)
+            tokens = tokenize(text)
+            self.ids.append(verse_id)
+            self.book_ranks.append(book_rank)
+            self.chapter_ranks.append(chapter_rank)
+            self.texts.append(text)
+            self.lengths.append(len(tokens))
+            for token in tokens:
+                self.postings[token][doc] = self.postings[token].get(doc, 0) + 1
+
+        self.postings = dict(self.postings)
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.ids else 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def match(self, term: str) -> Dict[int, int]:
+        """Documents containing `term`, with the term frequency
+
+        Args:
+            term (str): searched text, can contain several words
+
+        Returns:
+            dict: doc index -> term frequency
+        """
+        term = normalize_text(term).strip()
+        tokens = tokenize(term)
+        if not tokens:
+            return {}
+        # candidates come from the longest word, any token containing it
+        longest = max(tokens, key=len)
+        hits: Dict[int, int] = {}
+        for token, docs in self.postings.items():
+            if longest in token:
+                for doc, tf in docs.items():
+                    hits[doc] = hits.get(doc, 0) + tf
+        if tokens != [term]:
+            # phrase or punctuation : check real substring on stored text
+            hits = {
+                doc: self.texts[doc].count(term)
+                for doc in hits
+                if term in self.texts[doc]
+            }
+        return hits
+
+    def search(
+        self,
+        terms: List[str],
+        book_rank: Optional[int] = None,
+        chapter_rank: Optional[int] = None,
+        order: str = ORDER_RANK,
+    ) -> List[int]:
+        """Search verses matching any of terms
+
+        Returns:
+            list: matching verse ids, ordered by `order`
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        n = len(self.ids)
+        for term in terms:
+            hits = self.match(term)
+            if not hits:
+                continue
+            idf = math.log(1 + (n - len(hits) + 0.5) / (len(hits) + 0.5))
+            for doc, tf in hits.items():
+                norm = self.k1 * (
+                    1 - self.b + self.b * self.lengths[doc] / (self.avg_length or 1)
+                )
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        docs = [
+            doc
+            for doc in scores
+            if (book_rank is None or self.book_ranks[doc] == book_rank)
+            and (chapter_rank is None or self.chapter_ranks[doc] == chapter_rank)
+        ]
+        if order == ORDER_RELEVANCE:
+            docs.sort(key=lambda doc: (-scores[doc], doc))
+        else:
+            docs.sort()
+        return [self.ids[doc] for doc in docs]
+
+
+class TextIndexes(BibleIndexes[TextIndex]):
+    """Text indexes of all bible versions"""
+
+    def build(self, db: Session, bible_id: int) -> TextIndex:
+        rows = crud.verse.query_text_rows(db, bible_id)
+        index = TextIndex(bible_id, rows)
+        logger.info(
+            "Text index built for bible %s : %s verses, %s tokens",
+            bible_id,
+            len(index),
+            len(index.postings),
+        )
+        return index
+
+
+text_index = TextIndexes()
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.index.base import registries
+from app.index.references import parse_bible_ref
+
+logger = logging.getLogger(__name__)
+
+
+class ThemeNode(NamedTuple):
+    id: int
+    name: str
+    parent_id: Optional[int]
+    parent_name: Optional[str]
+    lang: Optional[str]  # language code, None if shared by all languages
+    references: Optional[str]
+    compiled: bool  # references compiled (see compile_theme)
+    reference_count: int
+    depth: int
+    children: List["ThemeNode"]
+
+    def in_lang(self, lang: Optional[str]) -> bool:
+        return not lang or self.lang is None or self.lang == lang.lower()
+
+
+def count_references(references: Optional[str]) -> int:
+    """Number of references compiled from a theme, e.g 'Rev.5:1,4-5' counts 2"""
+    return sum(len(ref["verses"] or [None]) for ref in parse_bible_ref(references))
+
+
+class ThemeTree:
+    """Process wide cache of all themes, parents before their children, built
+    with one query on first use
+
+    Dropped with bible indexes, as themes are compiled again at each import,
+    and built again after `reload_interval` seconds, as themes are written
+    outside of the app.
+    """
+
+    def __init__(self, reload_interval: float = 30) -> None:
+        self.reload_interval = reload_interval
+        self._nodes: Optional[Dict[int, ThemeNode]] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped on invalidation
+        registries.append(self)
+
+    def build(self, db: Session) -> Dict[int, ThemeNode]:
+        nodes: Dict[int, ThemeNode] = {}
+        for row in crud.theme.query_tree(db):
+            theme_id, name, parent_id, lang, references, compiled, depth, count = row
+            parent = nodes.get(parent_id)
+            compiled = bool(references) and compiled == references
+            node = ThemeNode(
+                theme_id,
+                name,
+                parent_id,
+                parent.name if parent else None,
+                lang,
+                references,
+                compiled,
+                count if compiled else count_references(references),
+                depth,
+                [],
+            )
+            if parent:
+                parent.children.append(node)
+            nodes[theme_id] = node
+        logger.info("Theme tree built : %s themes", len(nodes))
+        return nodes
+
+    def _built(self) -> Optional[Dict[int, ThemeNode]]:
+        """Themes if built less than `reload_interval` seconds ago"""
+        nodes = self._nodes
+        if time.monotonic() - self._built_at > self.reload_interval:
+            return None
+        return nodes
+
+    def get(self, db: Session) -> Dict[int, ThemeNode]:
+        nodes = self._built()
+        if nodes is None:
+            generation = self._generation
+            nodes = self.build(db)
+            with self._lock:
+                if generation == self._generation:
+                    self._nodes = nodes
+                    self._built_at = time.monotonic()
+        return nodes
+
+    async def aget(self, db: AsyncSession) -> Dict[int, ThemeNode]:
+        """Themes from an async session, queries only to build the tree"""
+        nodes = self._built()
+        if nodes is None:
+            nodes = await db.run_sync(self.get)
+        return nodes
+
+    def roots(self, db: Session, lang: Optional[str] = None) -> List[ThemeNode]:
+        return [
+            node
+            for node in self.get(db).values()
+            if node.parent_id is None and node.in_lang(lang)
+        ]
+
+    def invalidate(self, bible_id: Optional[int] = None):
+        with self._lock:
+            self._generation += 1
+            self._nodes = None
+
+
+theme_tree = ThemeTree()
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.index.base import registries
+
+logger = logging.getLogger(__name__)
+
+
+class VersionInfo(NamedTuple):
+    id: int
+    version: str
+    lang: Optional[str]
+    books: int
+    content_hash: Optional[str]
+    imported_at: Optional[datetime]
+
+
+class VersionRegistry:
+    """Process wide registry of bible versions, by upper cased version name
+
+    Dropped with other indexes when a bible is imported or deleted in this
+    process, and loaded again after `reload_interval` seconds, so versions
+    imported, updated or deleted by another process are picked up. Indexes
+    and caches of a bible whose fingerprint changed or which disappeared are
+    dropped then, before the new fingerprint is served.
+    """
+
+    def __init__(self, reload_interval: float = 30) -> None:
+        self.reload_interval = reload_interval
+        self._versions: Optional[Dict[str, VersionInfo]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped on invalidation
+        # content hash of each bible id at last load, kept on invalidation
+        self._fingerprints: Dict[int, Optional[str]] = {}
+        registries.append(self)
+
+    def load(self, db: Session) -> Dict[str, VersionInfo]:
+        # queried outside of the lock, see BibleIndexes
+        generation = self._generation
+        versions = {
+            row.version.upper(): VersionInfo(*row)
+            for row in crud.bible.query_versions(db)
+            if row.version
+        }
+        self._drop_changed(versions)
+        with self._lock:
+            if generation == self._generation:
+                self._versions = versions
+                self._loaded_at = time.monotonic()
+        logger.info("Version registry loaded : %s versions", len(versions))
+        return versions
+
+    def _drop_changed(self, versions: Dict[str, VersionInfo]):
+        """Invalidate indexes of bibles updated or deleted since last load,
+        by another process"""
+        fingerprints = {info.id: info.content_hash for info in versions.values()}
+        with self._lock:
+            previous, self._fingerprints = self._fingerprints, fingerprints
+        for bible_id, content_hash in previous.items():
+            if bible_id not in fingerprints or fingerprints[bible_id] != content_hash:
+                logger.info("Bible %s changed, dropping its indexes", bible_id)
+                for registry in registries:
+                    if registry is not self:
+                        registry.invalidate(bible_id)
+
+    def _loaded(self) -> Optional[Dict[str, VersionInfo]]:
+        """Versions if loaded less than `reload_interval` seconds ago"""
+        versions = self._versions
+        if time.monotonic() - self._loaded_at > self.reload_interval:
+            return None
+        return versions
+
+    def get(self, db: Session, version: str) -> Optional[VersionInfo]:
+        versions = self._loaded()
+        if versions is None:
+            versions = self.load(db)
+        return versions.get(version.upper())
+
+    async def aget(self, db: AsyncSession, version: str) -> Optional[VersionInfo]:
+        """Version info from an async session, queries only to (re)load"""
+        versions = self._loaded()
+        if versions is None:
+            return await db.run_sync(self.get, version)
+        return versions.get(version.upper())
+
+    def fresh(self) -> bool:
+        """True if loaded less than `reload_interval` seconds ago, `peek`
+        answers then"""
+        return self._loaded() is not None
+
+    def peek(self, version: str) -> Optional[VersionInfo]:
+        """Version info if registry is loaded and fresh, never queries db
+
+        None once expired, stale fingerprints are not used as validators.
+        """
+        versions = self._loaded()
+        return versions.get(version.upper()) if versions is not None else None
+
+    def bible_id(self, db: Session, version: str) -> Optional[int]:
+        info = self.get(db, version)
+        return info.id if info else None
+
+    def ids(self, db: Session, versions: List[str]) -> Dict[str, int]:
+        """Bible id of each existing version, in versions order"""
+        res = {}
+        for version in versions:
+            info = self.get(db, version)
+            if info:
+                res[version.upper()] = info.id
+        return res
+
+    async def abible_id(self, db: AsyncSession, version: str) -> Optional[int]:
+        info = await self.aget(db, version)
+        return info.id if info else None
+
+    async def aids(self, db: AsyncSession, versions: List[str]) -> Dict[str, int]:
+        res = {}
+        for version in versions:
+            info = await self.aget(db, version)
+            if info:
+                res[version.upper()] = info.id
+        return res
+
+    def invalidate(self, bible_id: Optional[int] = None):
+        with self._lock:
+            self._generation += 1
+            self._versions = None
+
+
+version_registry = VersionRegistry()
@@ -1,4 +1,5 @@
 import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import APIRouter, FastAPI, Request
@@ -6,13 +7,35 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.db.session import SessionLocal, async_engine, read_replicas
+from app.index import text_index, verse_map, version_registry
 
 BASE_PATH = Path(__file__).resolve().parent
 # TEMPLATES = Jinja2Templates(directory=str(BASE_PATH / "templates"))
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = SessionLocal()
+    try:
+        version_registry.load(db)
+        if settings.INDEX_PRELOAD:
+            verse_map.preload(db)
+            if settings.SEARCH_INDEX_ENABLED:
+                text_index.preload(db)
+    finally:
+        db.close()
+    yield
+    # async connections are bound to the event loop ending here
+    await async_engine.dispose()
+    await read_replicas.dispose()
+
+
 root_router = APIRouter()
 app = FastAPI(
-    title=f"{settings.API_TITLE}", openapi_url=f"{settings.API_VERSION}/openapi.json"
+    title=f"{settings.API_TITLE}",
+    openapi_url=f"{settings.API_VERSION}/openapi.json",
+    lifespan=lifespan,
 )
 
 # app = FastAPI(
@@ -54,6 +77,16 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def add_cache_headers(request: Request, call_next):
+    """HTTP validators set by `check_not_modified` dependency"""
+    response = await call_next(request)
+    headers = getattr(request.state, "cache_headers", None)
+    if headers and response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+
 app.include_router(api_router, prefix=settings.API_VERSION)
 app.include_router(root_router)
 
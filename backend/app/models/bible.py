@@ -1,11 +1,34 @@
 import enum
 from typing import List, Optional
 
-from sqlalchemy import Column, Enum, ForeignKey, Integer, String, Text, func, select
-from sqlalchemy.orm import Mapped, column_property, relationship
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+from sqlalchemy.orm import Mapped, column_property, deferred, relationship
 
 from app.db.base_class import Base
 
+# postgres text search configuration per language code, "simple" if not listed
+TEXT_SEARCH_CONFIGS = {
+    "en": "english",
+    "fr": "french",
+    "de": "german",
+    "el": "greek",
+}
+
 
 class Language(Base):
     """Language model
@@ -19,6 +42,10 @@ class Language(Base):
     def __str__(self):
         return self.name
 
+    @property
+    def text_search_config(self):
+        return TEXT_SEARCH_CONFIGS.get(self.code, "simple")
+
 
 class BookTypeEnum(enum.Enum):
     OLD = "Old"
@@ -36,6 +63,9 @@ class Bible(Base):
     src_url = Column(String(1024))
     lang_id = Column(Integer, ForeignKey("language.id"))
     lang = relationship("Language")
+    # content fingerprint and its last change, set at import (see fingerprint_bible)
+    content_hash = Column(String(64))
+    imported_at = Column(DateTime(timezone=True))
     # books = relationship("Book", back_populates="bible", cascade="all, delete")
 
 
@@ -47,11 +77,29 @@ class Verse(Base):
     rank_all = Column(Integer, nullable=False)
     code = Column(String, nullable=False)
     refs = Column(String)
+    ts_config = Column(REGCONFIG, nullable=False, server_default=text("'simple'"))
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector(ts_config, coalesce(subtitle, '') || ' ' || content)",
+                persisted=True,
+            ),
+        )
+    )
+    # lowercased subtitle and content without accents, see normalize_text
+    folded_text = deferred(Column(Text))
     chapter_id = Column(
         Integer, ForeignKey("chapter.id", ondelete="cascade"), nullable=False
     )
     chapter = relationship("Chapter", back_populates="verses")
 
+    # trigram index ix_verse_folded_text is not declared: migration a41d5be8c0f2
+    # creates it only where pg_trgm is available (ignored by autogenerate)
+    __table_args__ = (
+        Index("ix_verse_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
     @property
     def chapter_rank(self):
         return self.chapter.rank
@@ -83,6 +131,8 @@ class Chapter(Base):
     rank = Column(Integer, nullable=False)
     code = Column(String, nullable=False)
     book_id = Column(Integer, ForeignKey("book.id", ondelete="cascade"), nullable=False)
+    # chapter and verses as imported (see chapter_hash), None before import
+    content_hash = Column(String(64))
     book = relationship("Book", back_populates="chapters")
     verses: Mapped[List["Verse"]] = relationship(
         back_populates="chapter",
@@ -143,13 +193,111 @@ class Book(Base):
         return self.name
 
 
+class Alignment(Base):
+    """Verse position in canonical versification, to match verses across
+    versions with different chapter splits
+    """
+
+    id = Column(Integer, primary_key=True)
+    canon_id = Column(Integer, nullable=False)
+    bible_id = Column(
+        Integer, ForeignKey("bible.id", ondelete="cascade"), nullable=False
+    )
+    verse_id = Column(
+        Integer,
+        ForeignKey("verse.id", ondelete="cascade"),
+        nullable=False,
+        unique=True,
+    )
+
+    __table_args__ = (Index("ix_alignment_bible_id_canon_id", bible_id, canon_id),)
+
+
+class ChapterPayload(Base):
+    """Chapter serialized once at import, served as is (see store_payloads)
+
+    `header` is the chapter JSON without verses, `verses` the JSON list of its
+    verses.
+    """
+
+    id = Column(Integer, primary_key=True)
+    bible_id = Column(
+        Integer, ForeignKey("bible.id", ondelete="cascade"), nullable=False
+    )
+    chapter_id = Column(
+        Integer,
+        ForeignKey("chapter.id", ondelete="cascade"),
+        nullable=False,
+        unique=True,
+    )
+    code = Column(String, nullable=False)
+    verse_count = Column(Integer, nullable=False)
+    header = Column(LargeBinary, nullable=False)
+    verses = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (Index("ix_chapterpayload_bible_id_code", bible_id, code),)
+
+
 class Theme(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     parent_id = Column(Integer, ForeignKey("theme.id", ondelete="cascade"))
     parent = relationship("Theme", remote_side=[id])
+    # language of the theme name, None if shared by all languages
+    lang_id = Column(Integer, ForeignKey("language.id"))
     references = Column(Text)
+    # `references` as last compiled into `reference_parts` (see compile_theme)
+    compiled_references = Column(Text)
+    reference_parts = relationship(
+        "ThemeReference",
+        cascade="all, delete-orphan",
+        order_by="ThemeReference.position",
+    )
 
     @property
     def parent_name(self):
         return self.parent.name if self.parent else None
+
+
+class ThemeReference(Base):
+    """One reference of a theme, e.g 'joh_ 3:16-18', compiled from
+    `Theme.references` when the theme is saved or a bible imported
+
+    `book` and `location` are kept as written, for labels. `book_rank` is None
+    when no version knows the book, verse bounds are None for whole chapters.
+    """
+
+    id = Column(Integer, primary_key=True)
+    theme_id = Column(
+        Integer, ForeignKey("theme.id", ondelete="cascade"), nullable=False
+    )
+    position = Column(Integer, nullable=False)
+    book = Column(String, nullable=False)
+    location = Column(String, nullable=False)
+    book_rank = Column(Integer)
+    chapter = Column(Integer)
+    to_chapter = Column(Integer)
+    from_verse = Column(Integer)
+    to_verse = Column(Integer)
+    intervals = relationship("ThemeInterval", cascade="all, delete-orphan")
+
+    __table_args__ = (Index("ix_themereference_theme_id_position", theme_id, position),)
+
+
+class ThemeInterval(Base):
+    """rank_all interval of a theme reference in one bible version, no row if
+    the version has none of its verses"""
+
+    id = Column(Integer, primary_key=True)
+    reference_id = Column(
+        Integer, ForeignKey("themereference.id", ondelete="cascade"), nullable=False
+    )
+    bible_id = Column(
+        Integer, ForeignKey("bible.id", ondelete="cascade"), nullable=False
+    )
+    first_rank = Column(Integer, nullable=False)
+    last_rank = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_themeinterval_reference_id_bible_id", reference_id, bible_id),
+    )
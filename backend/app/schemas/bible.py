@@ -1,3 +1,4 @@
+import json
 from typing import Dict, Generic, List, Optional, Sequence, TypeVar, Union
 
 from pydantic import BaseModel, ConfigDict
@@ -5,6 +6,13 @@ from pydantic import BaseModel, ConfigDict
 DataT = TypeVar("DataT")
 
 
+def dump_json(data) -> bytes:
+    """JSON encoded as FastAPI does for responses, for payloads rendered ahead"""
+    return json.dumps(
+        data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
 class ListItems(BaseModel, Generic[DataT]):
     """Pydantic generic model for items in list"""
 
@@ -105,9 +113,11 @@ class VerseItem(BaseModel):
 class VerseItems(ListItems[VerseItem]):
     """Pydantic model for Verse list"""
 
+    total: Optional[int] = 0  # None when not computed
     next: Optional[VerseItem] = None
     previous: Optional[VerseItem] = None
     trans: Optional[List["VerseTransItems"]] = []
+    next_cursor: Optional[str] = None  # to get the following page
 
 
 class VerseTransItems(BaseModel):
@@ -137,7 +147,13 @@ class ThemeItem(BaseModel):
     name: str
     parent_id: Optional[int] = None
     parent_name: Optional[str] = None
+    lang: Optional[str] = None
     references: Optional[str] = None
+    reference_count: int = 0
+
+
+class ThemeTreeItem(ThemeItem):
+    children: List["ThemeTreeItem"] = []
 
 
 BibleItem.model_rebuild()
@@ -13,9 +13,11 @@ fi
 export APP_MODULE=${APP_MODULE-app.main:app}
 export HOST=${HOST:-0.0.0.0}
 export PORT=${PORT:-8001}
+# gunicorn workers, also sizing db pools of each worker (see Settings)
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-1}
 # export BACKEND_CORS_ORIGINS=${BACKEND_CORS_ORIGINS}
 # export BACKEND_CORS_ORIGINS=["http://localhost:3000","http://localhost:8000"]
 
 # run gunicorn
-exec gunicorn --bind $HOST:$PORT "$APP_MODULE" -k uvicorn.workers.UvicornWorker --access-logfile '-'
+exec gunicorn --bind $HOST:$PORT --workers $WEB_CONCURRENCY "$APP_MODULE" -k uvicorn.workers.UvicornWorker --access-logfile '-'
 
@@ -1,6 +1,8 @@
+from contextlib import contextmanager
 from typing import List
 
 import pytest
+from sqlalchemy import event
 
 
 class DictObj:
@@ -65,3 +67,29 @@ def standard_check(response, check_empty=True, to_dict=True) -> dict[List]:
     if to_dict:
         data = DictObj(data)
     return data
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed in the block, e.g
+
+    with count_queries() as queries:
+        ...
+    assert queries[0] == 2
+    """
+    # imported here, tests package is loaded before conftest sets the db url
+    from app.db.session import async_engine, engine
+
+    queries = [0]
+
+    def before_execute(*args):
+        queries[0] += 1
+
+    engines = (engine, async_engine.sync_engine)
+    for eng in engines:
+        event.listen(eng, "before_cursor_execute", before_execute)
+    try:
+        yield queries
+    finally:
+        for eng in engines:
+            event.remove(eng, "before_cursor_execute", before_execute)
@@ -1,3 +1,4 @@
+import json
 import logging
 import random
 import urllib.parse
@@ -6,7 +7,7 @@ import pytest
 
 from app.db.start.constants import BOOK_CODES, CHAPTER_VERSES_COUNT_MG
 from app.models.bible import BookTypeEnum
-from tests import delete_url, get_raw_url, get_url
+from tests import count_queries, delete_url, get_raw_url, get_url
 
 logger = logging.getLogger(__name__)
 
@@ -109,6 +110,9 @@ def test_get_verse_translate(client):
     assert data.trans[0].version == "KJV"
     assert len(data.trans[0].verses) == 3
     assert data.trans[0].verses[0].code == "mat_.05.01"
+    assert data.previous.code == "mat_.04.25"
+    assert data.previous.book_name == data.results[0].book_name
+    assert data.next.code == "mat_.05.04"
 
 
 def test_get_verse_same_chapter_set(client):
@@ -219,6 +223,126 @@ def test_get_verse_empty(client):
     assert len(data.results) == 0
 
 
+def test_conditional_get(client):
+    uri = f"{MG_VERSION}/chapters/mat_.2"
+    response = get_raw_url(client, uri)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["last-modified"]
+    assert response.headers["cache-control"]
+
+    with count_queries() as queries:
+        response = get_raw_url(client, uri, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert queries[0] == 0
+
+    # translations are part of the content
+    response = get_raw_url(
+        client,
+        f"{MG_VERSION}/verses/mat_?from_chapter=2&translate_versions=kjv",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    client.headers.pop("If-None-Match")
+
+
+def test_response_cache(client):
+    uri = f"{MG_VERSION}/chapters/mat_.3"
+    get_url(client, uri, check_empty=False)
+    with count_queries() as queries:
+        response = get_raw_url(client, uri.lower())
+        assert response.status_code == 200
+        assert response.headers["x-cache"] == "HIT"
+        assert response.headers["etag"]
+        # not found is cached too
+        for _ in range(2):
+            response = get_raw_url(client, f"{MG_VERSION}/chapters/mat_.99")
+            assert response.status_code == 404
+    assert queries[0] == 2  # payload then chapter lookup, first not found only
+
+    stats = get_url(client, "cache/stats", check_empty=False)
+    assert stats.hits >= 2
+    assert stats.misses >= 2
+
+
+def test_pool_stats(client):
+    get_url(client, f"{MG_VERSION}/search?text=sambatra", check_empty=False)
+    stats = get_url(client, "pool/stats", check_empty=False, to_dict=False)
+    assert stats["async"]["checkouts"] >= 1
+    assert stats["async"]["in_use"] == 0
+    assert stats["sync"]["size"] >= 1
+
+
+def test_get_verses_queries_per_page(client):
+    uri = (
+        f"{MG_VERSION}/verses/mat_/?from_chapter=1&from_verse=1&to_book=mar_"
+        "&translate_versions=kjv"
+    )
+    get_url(client, uri)  # build in memory indexes first
+    with count_queries() as queries:
+        data = get_url(client, uri)
+    assert data.count == 100
+    assert {v.chapter_rank for v in data.results} == {1, 2, 3, 4, 5}
+    assert data.trans[0].verses[0].book_rank == 40
+    # page, translations and previous/next verses, whatever the page spans
+    assert queries[0] == 3
+
+    refs = urllib.parse.quote_plus("Matio 2:1,4-5;Jao 3:1-20;Sal 23")
+    uri = f"{MG_VERSION}/verses_ref?references={refs}&translate_versions=kjv"
+    get_url(client, uri)
+    with count_queries() as queries:
+        get_url(client, uri, headers={"Cache-Control": "no-cache"})
+    client.headers.pop("Cache-Control")
+    # verses, translations and translated book names
+    assert queries[0] == 3
+
+
+def test_get_whole_chapter(client):
+    chapter = get_url(client, f"{MG_VERSION}/chapters/joh_.3", check_empty=False)
+    data = get_url(client, f"{MG_VERSION}/verses/joh_?from_chapter=3")
+    assert data.count == data.total == chapter.verse_count == len(chapter.verses)
+    assert [v.code for v in data.results] == [v.code for v in chapter.verses]
+    assert data.results[0].book_name == chapter.verses[0].book_name
+    assert data.previous.code == "joh_.02.25"
+    assert data.next.code == "joh_.04.01"
+
+
+def test_stream_verses(client):
+    response = get_raw_url(client, f"{MG_VERSION}/stream?from_book=mat_&to_book=mar_")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    verses = [json.loads(line) for line in response.text.splitlines()]
+    data = get_url(client, f"{MG_VERSION}/verses/mat_/?from_chapter=1&to_book=mar_")
+    assert len(verses) == data.total
+    assert verses[0]["code"] == "mat_.01.01"
+    assert verses[-1]["book_rank"] == 41
+    ranks = [v["rank_all"] for v in verses]
+    assert ranks == sorted(ranks)
+
+    response = get_raw_url(client, f"{MG_VERSION}/stream?from_book=mar_&to_book=mat_")
+    assert response.status_code == 400
+    response = get_raw_url(client, f"{MG_VERSION}/stream?from_book=xyz")
+    assert response.status_code == 404
+
+
+def test_get_verses_cursor(client):
+    uri = f"{MG_VERSION}/verses/mat_/?from_chapter=1&from_verse=1&to_book=mar_"
+    data = get_url(client, f"{uri}&max_results=40")
+    assert data.next_cursor
+    codes = [v.code for v in data.results]
+    while data.next_cursor:
+        data = get_url(client, f"{uri}&max_results=40&cursor={data.next_cursor}")
+        codes += [v.code for v in data.results]
+    assert len(codes) == data.total
+    data = get_url(client, f"{uri}&offset=40&max_results=40")
+    assert [v.code for v in data.results] == codes[40:80]
+
+    response = get_raw_url(client, f"{uri}&cursor=xxx")
+    assert response.status_code == 400
+
+
 def test_get_verses_of_full_book(client):
     indexes = random.sample(list(BOOK_CODES.keys()), 5)
     for i in indexes:
@@ -239,6 +363,14 @@ def test_get_verse_references(client):
     assert len(data.results[3].verses) == 0  # inexistant verse
     assert data.results[-1].verses[0].code == "act_.10.12"
 
+    refs = "Sal 23-24;Apo.5:4–5"
+    data = get_url(
+        client, f"{MG_VERSION}/verses_ref?references={urllib.parse.quote_plus(refs)}"
+    )
+    assert len(data.results) == 2
+    assert len(data.results[0].verses) == 16
+    assert [v.code for v in data.results[1].verses] == ["rev_.05.04", "rev_.05.05"]
+
     refs = "Salamo 23;Sal 24"
     data = get_url(
         client, f"{MG_VERSION}/verses_ref?references={urllib.parse.quote_plus(refs)}"
@@ -265,12 +397,75 @@ def test_get_verse_references(client):
     )
 
 
+def test_get_verse_references_html(client):
+    refs = urllib.parse.quote_plus("Matio 2:1-3; Jaona 3:16")
+    uri = f"{MG_VERSION}/verses_ref?references={refs}&translate_versions=kjv&to_html=1"
+    pages = []
+    for _ in range(2):
+        response = get_raw_url(client, uri, headers={"cache-control": "no-cache"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        pages.append(response.text)
+    client.headers.pop("cache-control")
+    assert pages[0] == pages[1]
+    assert "Matio 2:1-3" in pages[0]
+    # second page made of fragments rendered for the first one
+    stats = get_url(client, "cache/stats", check_empty=False)
+    assert stats.fragments.hits >= 4
+
+
 def test_search_text(client):
     data = get_url(client, f"{MG_VERSION}/search?text=ampionony")
     assert data.count == 1
     assert data.total == 1
     assert data.results[0].code == "isa_.40.01"
 
+    data = get_url(client, f"{MG_VERSION}/search?text=AMPIONONY")
+    assert data.total == 1
+
+
+def test_search_text_relevance(client):
+    data = get_url(
+        client, f"{MG_VERSION}/search?text=sambatra&book=mat_&book_chapter=5"
+    )
+    ranked = get_url(
+        client,
+        f"{MG_VERSION}/search?text=sambatra&book=mat_&book_chapter=5&order=relevance",
+    )
+    assert ranked.total == data.total
+    assert sorted(v.code for v in ranked.results) == [v.code for v in data.results]
+
+
+def test_search_fulltext(client):
+    data = get_url(
+        client, "kjv/search?text=blessed&book=mat_&book_chapter=5&mode=fulltext"
+    )
+    codes = [v.code for v in data.results]
+    assert "mat_.05.03" in codes
+    assert "mat_.05.11" in codes
+    assert data.total >= 9
+
+    ranked = get_url(
+        client,
+        "kjv/search?text=blessed&book=mat_&book_chapter=5&mode=fulltext&order=relevance",
+    )
+    assert ranked.total == data.total
+
+
+def test_search_text_cursor(client):
+    for mode in ("text", "fulltext"):
+        uri = f"kjv/search?text=blessed&mode={mode}&max_results=10"
+        data = get_url(client, uri)
+        codes = [v.code for v in data.results]
+        total = data.total
+        while data.next_cursor:
+            data = get_url(client, f"{uri}&cursor={data.next_cursor}")
+            codes += [v.code for v in data.results]
+        assert len(codes) == len(set(codes)) == total
+
+    data = get_url(client, "kjv/search?text=blessed&mode=fulltext&with_total=false")
+    assert data.total is None
+
 
 def test_search_text_in_book(client):
     data = get_url(
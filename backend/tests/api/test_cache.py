@@ -0,0 +1,77 @@
+import time
+
+from starlette.requests import Request
+
+from app import crud
+from app.api import cache as cache_module
+from app.api.cache import CachedResponse, ResponseCache, cache_key
+from app.index.base import registries
+from app.index.versions import VersionInfo, VersionRegistry
+
+
+def test_response_cache():
+    cache = ResponseCache(maxsize=2, ttl=60)
+    entry = CachedResponse(200, b"{}", {})
+    cache.set("a", entry)
+    cache.set("b", entry)
+    assert cache.get("a") is entry
+    cache.set("c", entry)  # "b" is the least recently used
+    assert cache.get("b") is None
+    assert cache.get("c") is entry
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1}
+
+    cache.set("d", entry, ttl=0)  # not found kept until versions reload
+    time.sleep(0.001)
+    assert cache.get("d") is None
+    cache.ttl = 0
+    cache.set("d", entry, ttl=60)
+    time.sleep(0.001)
+    assert cache.get("d") is None
+
+    cache.invalidate(1)
+    assert len(cache) == 0
+
+
+def test_cache_key(monkeypatch):
+    rows = [
+        VersionInfo(1, "BMG_1965", "mg", 66, "a", None),
+        VersionInfo(2, "KJV", "en", 66, "b", None),
+        VersionInfo(3, "LSG_21", "fr", 66, "c", None),
+    ]
+    monkeypatch.setattr(crud.bible, "query_versions", lambda db: list(rows))
+    registry = VersionRegistry(reload_interval=60)
+    registries.remove(registry)
+    monkeypatch.setattr(cache_module, "version_registry", registry)
+
+    def request(query, version="bmg_1965"):
+        return Request(
+            {
+                "type": "http",
+                "query_string": query.encode(),
+                "path_params": {"version": version},
+                "headers": [],
+            }
+        )
+
+    path = "/{version}/verses_ref"
+    query = "references=Jao+3&translate_versions=kjv,lsg_21"
+    assert cache_key(path, request(query)) is None  # versions not loaded
+    registry.load(None)
+    key = cache_key(path, request("references=Jao+3&translate_versions=kjv,lsg_21"))
+    assert key == cache_key(
+        path,
+        request("translate_versions=KJV&translate_versions=lsg_21&references=Jao+3"),
+    )
+    assert key == cache_key(
+        path, request("references=Jao+3&translate_versions=kjv,lsg_21", "BMG_1965")
+    )
+    assert key != cache_key(path, request("references=Jao+3&translate_versions=kjv"))
+    assert key != cache_key(
+        path, request("references=Jao+3&translate_versions=lsg_21,kjv")
+    )
+
+    # updated in place by another process
+    rows[1] = rows[1]._replace(content_hash="other")
+    registry.load(None)
+    assert key != cache_key(path, request(query))
+    assert cache_key(path, request(query, "unknown"))[-1][0] is None
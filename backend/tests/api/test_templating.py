@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+
+from app.api.templating import verse_ranges
+
+
+def _verses(bible_id, *ranks):
+    book = SimpleNamespace(bible_id=bible_id)
+    chapter = SimpleNamespace(book=book)
+    return [SimpleNamespace(rank_all=r, chapter=chapter) for r in ranks]
+
+
+def test_verse_ranges():
+    assert verse_ranges([]) == ()
+    assert verse_ranges(_verses(1, 1, 2, 3, 7, 8)) == ((1, 1, 3), (1, 7, 8))
+    # translations interleaved with their source verses
+    mixed = _verses(1, 5) + _verses(2, 5) + _verses(1, 6)
+    assert verse_ranges(mixed) == ((1, 5, 5), (2, 5, 5), (1, 6, 6))
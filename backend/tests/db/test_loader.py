@@ -0,0 +1,84 @@
+from app.db.start.loader import (
+    _copy_value,
+    book_row,
+    chapter_hash,
+    chapter_verses,
+    has_text,
+    split_subtitle,
+    verse_row,
+)
+from app.models.bible import BookTypeEnum
+from app.schemas.bible import BookItem, ChapterItem, VerseItem
+
+
+def test_split_subtitle():
+    assert split_subtitle("[Title] In the beginning") == ("[Title]", "In the beginning")
+    assert split_subtitle("[Title]  ") == (None, "[Title]  ")
+    assert split_subtitle("[Unclosed title") == (None, "[Unclosed title")
+    assert split_subtitle("No title") == (None, "No title")
+
+
+def test_has_text():
+    assert has_text("Élan")
+    assert not has_text("123 - 4")
+    assert not has_text("")
+
+
+def test_book_row():
+    row = book_row(BookItem(rank=62, name="1 John", category="New"), 3)
+    assert row["short_name"] == "1 joh"
+    assert row["code"] == "1joh_"
+    assert row["category"] == BookTypeEnum.NEW
+    assert row["bible_id"] == 3
+    row = book_row(
+        BookItem(rank=67, name="Extra", short_name="EXT", code="xtr", category="Old"),
+        3,
+    )
+    assert (row["short_name"], row["code"]) == ("Ext", "xtr")
+
+
+def test_verse_row():
+    row = verse_row(
+        VerseItem(rank=3, content="[Title] Text", refs="Gen 1:1"),
+        10,
+        "1jo_",
+        2,
+        41,
+        "english",
+    )
+    assert row["code"] == "1jo_.02.03"
+    assert (row["subtitle"], row["content"]) == ("[Title]", "Text")
+    assert row["rank_all"] == 41
+    assert row["folded_text"] == "[title]\ntext"
+    row = verse_row(
+        VerseItem(rank=1, content="Text", subtitle="Sub"), 10, "x", 1, 1, ""
+    )
+    assert row["subtitle"] == "Sub"
+
+
+def test_chapter_verses_and_hash():
+    chap = ChapterItem(
+        rank=2,
+        verses=[
+            VerseItem(rank=1, content="First"),
+            VerseItem(rank=2, content="- 2 -"),
+            VerseItem(rank=3, content="Third"),
+        ],
+    )
+    rows = chapter_verses(chap, 10, "gen_", 41, "english")
+    assert [(r["code"], r["rank_all"]) for r in rows] == [
+        ("gen_.02.01", 41),
+        ("gen_.02.03", 42),
+    ]
+    # verses moved by a previous chapter keep the chapter hash
+    shifted = chapter_verses(chap, 10, "gen_", 1, "english")
+    assert chapter_hash("gen_.2", rows) == chapter_hash("gen_.2", shifted)
+    chap.verses[0].content = "First, fixed"
+    fixed = chapter_verses(chap, 10, "gen_", 41, "english")
+    assert chapter_hash("gen_.2", rows) != chapter_hash("gen_.2", fixed)
+
+
+def test_copy_value():
+    assert _copy_value(None) == "\\N"
+    assert _copy_value(12) == "12"
+    assert _copy_value("a\tb\\c\nd") == "a\\tb\\\\c\\nd"
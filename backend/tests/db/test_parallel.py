@@ -0,0 +1,21 @@
+from app.core.config import settings
+from app.db.start.parallel import import_workers, run_import_job
+
+
+def test_import_workers(monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_WORKERS", 8)
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 100)
+    assert import_workers(4) == 4
+    assert import_workers(20) == 8
+    # 2 connections per import
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 10)
+    assert import_workers(20) == 5
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 1)
+    assert import_workers(20) == 1
+
+
+def test_failed_job_result():
+    result = run_import_job({"lang": "xx", "version": "NONE", "validate": False})
+    assert not result.ok
+    assert result.version == "NONE" and result.bible_id is None
+    assert "Source language xx not found" in result.error
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.core.config import Settings
+from app.db.pool import InstrumentedQueuePool, pool_stats
+
+
+def test_pool_options_from_workers():
+    options = Settings(WEB_CONCURRENCY=1, DB_MAX_CONNECTIONS=100).db_pool_options
+    assert (options["pool_size"], options["max_overflow"]) == (5, 10)
+    # 100 connections for 8 workers with 2 engines each
+    options = Settings(WEB_CONCURRENCY=8, DB_MAX_CONNECTIONS=100).db_pool_options
+    assert (options["pool_size"], options["max_overflow"]) == (3, 3)
+    options = Settings(WEB_CONCURRENCY=8, DB_POOL_SIZE=1).db_pool_options
+    assert (options["pool_size"], options["max_overflow"]) == (1, 5)
+
+
+def test_pool_stats():
+    engine = create_engine(
+        "sqlite://",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.01,
+    )
+    first = engine.connect()
+    second = engine.connect()
+    stats = pool_stats(engine)
+    assert (stats["in_use"], stats["overflow"], stats["checkouts"]) == (2, 1, 2)
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    stats = pool_stats(engine)
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 10
+
+    first.close()
+    second.close()
+    assert pool_stats(engine)["in_use"] == 0
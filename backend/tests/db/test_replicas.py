@@ -0,0 +1,36 @@
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.replicas import ReadReplicas, Replica
+from app.db.session import SessionLocal
+
+UNREACHABLE_URL = "postgresql://nobody@127.0.0.1:1/none"
+
+
+def test_round_robin():
+    replicas = ReadReplicas([Replica(settings.db_url), Replica(settings.db_url)])
+    first, second, third = (replicas.candidates()[0] for _ in range(3))
+    assert first is not second
+    assert third is first
+
+
+def test_unreachable_replica_ejected():
+    down, up = Replica(UNREACHABLE_URL), Replica(settings.db_url)
+    replicas = ReadReplicas([down, up], eject_seconds=60)
+    for _ in range(2):
+        db = replicas.session(SessionLocal)
+        assert db.get_bind() is up.engine
+        assert db.execute(text("select 1")).scalar() == 1
+        db.close()
+    assert down.ejected_at is not None
+    assert replicas.candidates() == [up]
+
+    # tried again once ejection is over
+    replicas.eject_seconds = 0
+    assert down in replicas.candidates()
+
+
+def test_no_reachable_replica():
+    replicas = ReadReplicas([Replica(UNREACHABLE_URL)])
+    assert replicas.session(SessionLocal) is None
+    assert ReadReplicas([]).session(SessionLocal) is None
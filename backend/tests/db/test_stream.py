@@ -0,0 +1,77 @@
+import io
+import json
+
+import pytest
+
+from app.db.start.stream import JsonStream, bible_item_events, json_bible_events
+from app.schemas.bible import BibleItem
+
+BIBLE = {
+    "version": "KJV",
+    "lang": {"name": "English", "code": "en"},
+    "description": "King James",
+    "books": [
+        {
+            "rank": 1,
+            "name": "Genesis",
+            "category": "Old",
+            "chapters": [
+                {"rank": 1, "verses": [{"rank": 1, "content": "In the beginning"}]},
+                {"rank": 2, "verses": [{"rank": 1, "content": "Thus the heavens"}]},
+            ],
+        },
+        {"rank": 2, "name": "Exodus", "category": "Old", "chapters": []},
+    ],
+}
+
+
+def _events(data, chunk_size=7):
+    return [
+        (kind, item.model_dump())
+        for kind, item in json_bible_events(io.StringIO(json.dumps(data)), chunk_size)
+    ]
+
+
+def test_json_stream_values():
+    stream = JsonStream(
+        io.StringIO(' {"a": [12345, "x\\"y", {"b": null}], "c": 1.5}'), 2
+    )
+    values = []
+    for key in stream.members():
+        if key == "a":
+            for _ in stream.items():
+                values.append(stream.value())
+        else:
+            values.append(stream.value())
+    assert values == [12345, 'x"y', {"b": None}, 1.5]
+
+
+def test_json_bible_events():
+    events = _events(BIBLE)
+    assert [kind for kind, _ in events] == [
+        "bible",
+        "book",
+        "chapter",
+        "chapter",
+        "book",
+    ]
+    assert events[0][1]["description"] == "King James"
+    assert events[1][1]["name"] == "Genesis" and events[1][1]["chapters"] == []
+    assert events[3][1]["verses"][0]["content"] == "Thus the heavens"
+    # same events as the bible parsed at once
+    item = BibleItem.model_validate(BIBLE)
+    assert events == [(k, i.model_dump()) for k, i in bible_item_events(item)]
+
+
+def test_json_bible_events_chapters_first():
+    data = {**BIBLE, "books": [{"chapters": [{"rank": 1}], "rank": 1, "name": "Gen"}]}
+    assert [kind for kind, _ in _events(data)] == ["bible", "book", "chapter"]
+
+
+def test_json_bible_events_late_fields():
+    data = {"books": [], **BIBLE}
+    with pytest.raises(ValueError):
+        _events(data)
+    book = {"rank": 2, "name": "Exodus", "chapters": [], "short_name": "Exo"}
+    with pytest.raises(ValueError):
+        _events({**BIBLE, "books": [book]})
@@ -0,0 +1,59 @@
+from app.db.start.themes import compile_references, resolve_book_rank
+from app.index.books import BookResolver
+from app.index.coordinates import VerseMap
+
+# (bible id, book id, rank, code, name, short_name) of a malagasy and an english
+# version
+BOOKS = [
+    (1, 10, 19, "psa_", "Salamo", "Sal"),
+    (1, 11, 43, "joh_", "Jaona", "Jao"),
+    (2, 20, 19, "psa_", "Psalms", "Psa"),
+    (2, 21, 43, "joh_", "John", "Joh"),
+]
+# psalm 23 has 3 verses in both, john 3 has verse 16 only in the english one
+VERSES = {
+    1: [(1, 19, 23, 1), (2, 19, 23, 2), (3, 19, 23, 3), (4, 43, 3, 15)],
+    2: [(1, 19, 23, 1), (2, 19, 23, 2), (3, 19, 23, 3), (4, 43, 3, 16)],
+}
+
+
+def _indexes():
+    resolvers = [BookResolver(1, BOOKS[:2]), BookResolver(2, BOOKS[2:])]
+    return resolvers, {bid: VerseMap(bid, rows) for bid, rows in VERSES.items()}
+
+
+def test_resolve_book_rank():
+    resolvers, _ = _indexes()
+    assert resolve_book_rank(resolvers, "Jaona") == 43
+    assert resolve_book_rank(resolvers, "John") == 43
+    assert resolve_book_rank(resolvers, "Psalm") == 19  # fuzzy
+    assert resolve_book_rank(resolvers, "Genesis") is None
+    assert resolve_book_rank(resolvers, None) is None
+
+
+def test_compile_references():
+    parts, invalid = compile_references(
+        "Sal 23:1,2-3; John 3:16; psa_ 24; Gen 1", *_indexes()
+    )
+    assert [(p.book, p.location, p.book_rank) for p in parts] == [
+        ("Sal", "23:1", 19),
+        ("Sal", "23:2-3", 19),
+        ("John", "3:16", 43),
+        ("psa_", "24", 19),
+        ("Gen", "1", None),
+    ]
+    assert [p.position for p in parts] == [0, 1, 2, 3, 4]
+    assert (parts[1].chapter, parts[1].from_verse, parts[1].to_verse) == (23, 2, 3)
+    assert parts[3].from_verse is None
+
+    assert [(i.bible_id, i.first_rank, i.last_rank) for i in parts[1].intervals] == [
+        (1, 2, 3),
+        (2, 2, 3),
+    ]
+    # found in one version only
+    assert [(i.bible_id, i.first_rank) for i in parts[2].intervals] == [(2, 4)]
+    assert invalid == ["psa_ 24", "Gen 1"]
+
+
+def test_compile_no_references():
+    assert compile_references(None, *_indexes()) == ([], [])
@@ -0,0 +1,63 @@
+from app.db.start.update import VersionDiff, diff_verses
+
+
+def _verse(rank, content, rank_all, verse_id=None):
+    row = {
+        "rank": rank,
+        "rank_all": rank_all,
+        "code": "gen_.01.%02d" % rank,
+        "subtitle": None,
+        "content": content,
+        "refs": None,
+    }
+    if verse_id:
+        row["id"] = verse_id
+    return row
+
+
+def test_diff_verses():
+    stored = [
+        _verse(1, "One", 1, 101),
+        _verse(2, "Two", 2, 102),
+        _verse(3, "Three", 3, 103),
+        _verse(4, "Four", 4, 104),
+    ]
+    rows = [
+        _verse(1, "One", 1),
+        _verse(2, "Two, fixed", 2),
+        _verse(4, "Four", 3),
+        _verse(5, "Five", 4),
+    ]
+    inserts, updates, moves, deletes = diff_verses(stored, rows)
+    assert [r["rank"] for r in inserts] == [5]
+    assert [(r["id"], r["content"]) for r in updates] == [(102, "Two, fixed")]
+    assert [(r["id"], r["rank_all"]) for r in moves] == [(104, 3)]
+    assert [r["id"] for r in deletes] == [103]
+    assert diff_verses(stored, [dict(r) for r in stored]) == ([], [], [], [])
+
+
+def test_diff_verses_repeated_rank():
+    stored = [_verse(1, "A", 1, 101), _verse(1, "B", 2, 102)]
+    inserts, updates, moves, deletes = diff_verses(stored, [_verse(1, "A", 1)])
+    assert (inserts, updates, moves) == ([], [], [])
+    assert [r["id"] for r in deletes] == [102]
+
+
+def test_version_diff_summary():
+    diff = VersionDiff(
+        [],
+        {"added": 0, "updated": 1, "deleted": 0},
+        {"added": 0, "updated": 1, "deleted": 0, "shifted": 3},
+        {"added": [], "updated": ["gen_.01.02"], "deleted": []},
+        {1},
+        set(),
+    )
+    assert diff.changed
+    assert diff.summary() == (
+        "books 1 updated | chapters 1 updated, 3 shifted | verses 1 updated"
+    )
+    unchanged = VersionDiff([], {}, {}, {"added": []}, set(), set())
+    assert not unchanged.changed
+    assert (
+        unchanged.summary() == "books unchanged | chapters unchanged | verses unchanged"
+    )
@@ -0,0 +1,54 @@
+import pytest
+
+from app.db.start.import_version import BibleValidator, RulesEnum, VersionStats
+from app.models.bible import BookTypeEnum
+
+
+def _validator(rules):
+    validator = BibleValidator(1, rules)
+    validator._stats = VersionStats(
+        {10: (1, BookTypeEnum.OLD), 11: (40, BookTypeEnum.NEW)},
+        {10: [(1, 31), (2, 25)], 11: [(1, 25)]},
+        0,
+    )
+    return validator
+
+
+def test_rules_passed():
+    rules = [
+        (RulesEnum.BOOK_COUNT, [2]),
+        (RulesEnum.BOOK_COUNT_BY_CATEG, [BookTypeEnum.NEW, 1]),
+        (RulesEnum.BOOK_CATEGORY, [40, BookTypeEnum.NEW]),
+        (RulesEnum.BOOK_CHAPTER_COUNT, [1, 2]),
+        (RulesEnum.VERSE_COUNT, [1, 2, 25]),
+        (RulesEnum.COUNT_ALL_VERSE, [81]),
+        (RulesEnum.COUNT_ALL_VERSE, [56, BookTypeEnum.OLD]),
+        (RulesEnum.ALL_VERSE_PRESENT, []),
+        (
+            RulesEnum.COUNT_VERSE_PER_BOOK,
+            [{1: {"chapters": 2, "verses": 56}, 40: {"chapters": 1, "verses": 25}}],
+        ),
+    ]
+    assert _validator(rules).run() == []
+
+
+def test_all_failures_reported():
+    rules = [
+        (RulesEnum.BOOK_COUNT, [66]),
+        (RulesEnum.BOOK_CATEGORY, [16, BookTypeEnum.OLD]),
+        (RulesEnum.VERSE_COUNT, [1, 3, 24]),
+        (
+            RulesEnum.COUNT_VERSE_PER_BOOK,
+            [{1: {"chapters": 50, "verses": 56}, 2: {"chapters": 40, "verses": 1}}],
+        ),
+    ]
+    with pytest.raises(AssertionError) as err:
+        _validator(rules).run()
+    assert str(err.value).splitlines()[1:] == [
+        "- books : 2, expected 66",
+        "- book 16 : missing",
+        "- chapter 1.3 verses : 0, expected 24",
+        "- book 1 chapters : 2, expected 50",
+        "- book 40 : not expected",
+        "- book 2 : missing",
+    ]
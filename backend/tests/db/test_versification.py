@@ -0,0 +1,41 @@
+from app.db.start.versification import canonical_id, canonical_ids
+
+
+def _joel(chapters):
+    """Joel rows (verse id, code, book rank, chapter, verse), 5 verses per chapter"""
+    return [
+        (chapter * 10 + verse, "joe_", 29, chapter, verse)
+        for chapter in range(1, chapters + 1)
+        for verse in range(1, 6)
+    ]
+
+
+def test_canonical_id():
+    assert canonical_id(1, 1, 1) == 1001001
+    assert canonical_id(66, 22, 21) == 66022021
+
+
+def test_same_versification():
+    ids = dict(canonical_ids(_joel(3)))
+    assert ids[11] == canonical_id(29, 1, 1)
+    assert ids[31] == canonical_id(29, 3, 1)
+
+
+def test_split_versification():
+    ids = dict(canonical_ids(_joel(4)))
+    assert ids[25] == canonical_id(29, 2, 5)
+    assert ids[31] == canonical_id(29, 2, 28)
+    assert ids[35] == canonical_id(29, 2, 32)
+    assert ids[41] == canonical_id(29, 3, 1)
+
+    malachi = [(100 + chapter, "mal_", 39, chapter, 1) for chapter in (1, 2)]
+    malachi += [(verse, "mal_", 39, 3, verse) for verse in (18, 19, 24)]
+    ids = dict(canonical_ids(malachi))
+    assert ids[18] == canonical_id(39, 3, 18)
+    assert ids[19] == canonical_id(39, 4, 1)
+    assert ids[24] == canonical_id(39, 4, 6)
+
+
+def test_book_without_code():
+    ids = dict(canonical_ids([(1, None, 70, 2, 3)]))
+    assert ids[1] == canonical_id(70, 2, 3)
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.index.base import BibleIndexes, registries
+
+
+class Counter(BibleIndexes[int]):
+    """Index counting its builds, invalidated during the first one"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        registries.remove(self)
+        self.builds = 0
+
+    def build(self, db, bible_id: int) -> int:
+        self.builds += 1
+        if self.builds == 1:
+            self.invalidate(bible_id)
+        return self.builds
+
+
+class FakeAsyncSession:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def run_sync(self, fn, *args):
+        self.calls += 1
+        return fn(None, *args)
+
+
+def test_index_invalidated_while_building():
+    indexes = Counter()
+    # built before the bible changed, returned but not kept
+    assert indexes.get(None, 1) == 1
+    assert indexes.get(None, 1) == 2
+    assert indexes.get(None, 1) == 2
+
+
+def test_async_get_builds_once():
+    indexes = Counter()
+    indexes.get(None, 1)
+    db = FakeAsyncSession()
+    assert asyncio.run(indexes.aget(db, 1)) == 2
+    assert asyncio.run(indexes.aget(db, 1)) == 2
+    assert db.calls == 1
+
+
+class SlowIndex(BibleIndexes[int]):
+    """Index counting its builds, each one taking some time"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        registries.remove(self)
+        self.builds = 0
+
+    def build(self, db, bible_id: int) -> int:
+        self.builds += 1
+        time.sleep(0.05)
+        return bible_id * 10
+
+
+class SlowAsyncSession(FakeAsyncSession):
+    async def run_sync(self, fn, *args):
+        await asyncio.sleep(0.05)  # other requests run meanwhile
+        return await super().run_sync(fn, *args)
+
+
+def test_concurrent_get_builds_once():
+    indexes = SlowIndex()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: indexes.get(None, 1), range(8)))
+    assert results == [10] * 8
+    assert indexes.builds == 1
+
+
+def test_concurrent_aget_builds_once():
+    indexes = SlowIndex()
+    db = SlowAsyncSession()
+
+    async def lookups():
+        return await asyncio.gather(*(indexes.aget(db, 2) for _ in range(8)))
+
+    assert asyncio.run(lookups()) == [20] * 8
+    assert indexes.builds == 1 and db.calls == 1
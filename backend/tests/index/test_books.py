@@ -0,0 +1,47 @@
+from app.index.books import BKTree, BookResolver, book_key, edit_distance
+
+# (bible id, book id, rank, code, name, short_name)
+ROWS = [
+    (1, 10, 19, "psa_", "Salamo", "Sal"),
+    (1, 11, 43, "joh_", "Jaona", "Jao"),
+    (1, 12, 62, "1jo_", "1 Jaona", "1 Jao"),
+    (1, 13, 66, "rev_", "Apokalypsy", "Apo"),
+    # other version in same language
+    (2, 20, 19, "psa_", "Ny Salamo", "Sal"),
+    (2, 21, 66, "rev_", "Fanambarana", "Fan"),
+    (2, 22, 1, "gen_", "Genesisy", "Gen"),
+]
+
+
+def test_book_key_and_distance():
+    assert book_key(" 1 Jaona ") == "1jaona"
+    assert book_key("Apôkalypsy.") == "apokalypsy"
+    assert edit_distance("apocalypse", "apokalypsy") == 2
+    assert edit_distance("", "abc") == 3
+
+    tree = BKTree()
+    for word in ("salamo", "jaona", "apokalypsy"):
+        tree.add(word)
+    assert tree.search("jaoan", 2) == [(2, "jaona")]
+    assert tree.search("xxxx", 1) == []
+
+
+def test_resolve():
+    resolver = BookResolver(1, ROWS)
+    assert len(resolver) == 4
+    assert resolver.resolve("Salamo").rank == 19
+    assert resolver.resolve("SAL").id == 10
+    assert resolver.resolve("psa").rank == 19
+    assert resolver.resolve("1 jao").rank == 62
+    assert resolver.resolve("1jaona").code == "1jo_"
+    # identifiers of other versions in the same language
+    assert resolver.resolve("Ny Salamo").id == 10
+    assert resolver.resolve("Fanambarana").rank == 66
+    assert resolver.resolve("Genesisy") is None  # missing in this version
+    # prefixes and typos
+    assert resolver.resolve("Apok").rank == 66
+    assert resolver.resolve("apocalypse").rank == 66
+    assert resolver.resolve("Jaoan").rank == 43
+    assert resolver.resolve("xyz") is None
+    assert resolver.resolve("") is None
+    assert resolver.resolve(None) is None
@@ -0,0 +1,27 @@
+from app.index.coordinates import VerseMap
+
+# rank_all, book rank, chapter rank, verse rank
+ROWS = [(i + 1, 1, 1, i + 1) for i in range(3)]
+ROWS += [(i + 4, 1, 2, i + 1) for i in range(4)]
+ROWS += [(i + 8, 2, 1, i + 1) for i in range(2)]
+
+
+def test_find():
+    verse_map = VerseMap(1, ROWS)
+    assert len(verse_map) == 9
+    assert verse_map.find(1, 2, 1) == 4
+    assert verse_map.find(2, 1, 2) == 9
+    assert verse_map.find(2, 1, 3) is None
+
+
+def test_bounds():
+    verse_map = VerseMap(1, ROWS)
+    assert verse_map.last_chapter(1) == 2
+    assert verse_map.last_chapter(3) is None
+    assert verse_map.last_verse(1) == 7
+    assert verse_map.last_verse(1, 1) == 3
+    assert verse_map.count(2, 8) == 7
+    assert verse_map.previous(1) is None
+    assert verse_map.previous(4) == 3
+    assert verse_map.next(8) == 9
+    assert verse_map.next(9) is None
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+from app.index.coordinates import VerseMap
+from app.index.references import merge_intervals, split_verses, verse_intervals
+
+# book 19 : chapter 1 has verses 1-3, chapter 2 has verses 1, 2, 4 (3 is missing)
+ROWS = [(1, 19, 1, 1), (2, 19, 1, 2), (3, 19, 1, 3)]
+ROWS += [(4, 19, 2, 1), (5, 19, 2, 2), (6, 19, 2, 4)]
+
+
+def test_verse_intervals():
+    verse_map = VerseMap(1, ROWS)
+    assert verse_intervals(verse_map, 19, "1", None) == [(1, 3)]
+    assert verse_intervals(verse_map, 19, "1-2", None) == [(1, 6)]
+    assert verse_intervals(verse_map, 19, "2", "2") == [(5, 5)]
+    assert verse_intervals(verse_map, 19, "2", "2-3") == [(5, 5)]
+    assert verse_intervals(verse_map, 19, "2", "1–4") == [(4, 6)]
+    assert verse_intervals(verse_map, 19, "2", "3") == []
+    assert verse_intervals(verse_map, 19, "3", None) == []
+    assert verse_intervals(verse_map, 19, None, None) == []
+    assert verse_intervals(verse_map, 20, "1", "1") == []
+
+
+def test_verse_intervals_huge_ranges():
+    # bounded by the verses of the version, not by the typed range
+    verse_map = VerseMap(1, ROWS)
+    assert verse_intervals(verse_map, 19, "1", "1-999999999") == [(1, 3)]
+    assert verse_intervals(verse_map, 19, "2", "3-999999999") == [(6, 6)]
+    assert verse_intervals(verse_map, 19, "1-999999999", None) == [(1, 6)]
+    assert verse_intervals(verse_map, 19, "999999998-999999999", None) == []
+
+
+def test_merge_and_split():
+    assert merge_intervals([(4, 6), (1, 2), (3, 3), (8, 9)]) == [(1, 6), (8, 9)]
+    verses = [SimpleNamespace(rank_all=r) for r in (1, 2, 3, 5, 8)]
+    assert [v.rank_all for v in split_verses(verses, [(2, 5)])] == [2, 3, 5]
+    assert [v.rank_all for v in split_verses(verses, [(8, 9), (1, 1)])] == [1, 8]
+    assert split_verses(verses, []) == []
@@ -0,0 +1,41 @@
+from app.index.text import ORDER_RELEVANCE, TextIndex, normalize_text
+
+ROWS = [
+    (10, "Ampionony, ampionony ny oloko", None, 23, 40),
+    (11, "Sambatra ny malahelo", "[Toriteny]", 40, 5),
+    (12, "Sambatra ny mpamindra fo, fa hamindrana fo izy", None, 40, 5),
+    (13, "Ary ny fahasambarana", None, 40, 6),
+    (14, "Tsy misy na inona na inona", None, 40, 6),
+    (15, "Car l'Éternel connaît la voie des justes", None, 19, 1),
+]
+
+
+def test_normalize_text():
+    assert normalize_text("L'Éternel") == "l'eternel"
+    assert normalize_text("Noël, ÇA, Jéhovah, Jehôvah") == "noel, ca, jehovah, jehovah"
+    assert normalize_text(None) == ""
+
+
+def test_match_substring():
+    index = TextIndex(1, ROWS)
+    assert index.search(["sambatra"]) == [11, 12]
+    assert index.search(["SAMBATRA"]) == [11, 12]
+    assert index.search(["samba"]) == [11, 12, 13]
+    assert index.search(["toriteny"]) == [11]
+    assert index.search(["xyz"]) == []
+    assert index.search(["eternel"]) == index.search(["ÉTERNEL"]) == [15]
+    assert index.search(["connait"]) == [15]
+
+
+def test_match_phrase():
+    index = TextIndex(1, ROWS)
+    assert index.search(["ny oloko"]) == [10]
+    assert index.search(["mpamindra fo, fa"]) == [12]
+    assert index.search(["oloko ny"]) == []
+
+
+def test_search_filters_and_order():
+    index = TextIndex(1, ROWS)
+    assert index.search(["ny"], book_rank=40, chapter_rank=6) == [13]
+    assert index.search(["ampionony", "sambatra"]) == [10, 11, 12]
+    assert index.search(["ampionony", "sambatra"], order=ORDER_RELEVANCE)[0] == 10
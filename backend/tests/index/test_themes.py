@@ -0,0 +1,51 @@
+from app import crud
+from app.index.base import registries
+from app.index.themes import ThemeTree, count_references
+
+# (id, name, parent id, language, references, compiled references, depth,
+# compiled reference count)
+ROWS = [
+    (1, "Fitiavana", None, None, "joh_ 3:16; mat_ 5:3,5-10", "joh_ 3:16", 0, 1),
+    (4, "Love", None, "en", None, None, 0, 0),
+    (2, "Finoana", 1, "mg", "psa_ 23", "psa_ 23", 1, 1),
+    (3, "Faith", 1, "en", "rev_ 1:1-3", None, 1, 0),
+]
+
+
+def test_count_references():
+    assert count_references("Rev.5:1,4-5; Acts 5:15-20,25; John 3.16;Psa 23") == 6
+    assert count_references(None) == 0
+
+
+def test_theme_tree(monkeypatch):
+    monkeypatch.setattr(crud.theme, "query_tree", lambda db: ROWS)
+    tree = ThemeTree()
+    registries.remove(tree)
+    nodes = tree.get(None)
+
+    assert [child.id for child in nodes[1].children] == [2, 3]
+    assert nodes[3].parent_name == "Fitiavana"
+    # compiled references changed since, counted from the text
+    assert not nodes[1].compiled and nodes[1].reference_count == 3
+    assert nodes[2].compiled and nodes[2].reference_count == 1
+    assert nodes[4].reference_count == 0
+
+    assert [node.id for node in tree.roots(None)] == [1, 4]
+    assert [node.id for node in tree.roots(None, "MG")] == [1]
+    assert [node.id for node in nodes.values() if node.in_lang("en")] == [1, 4, 3]
+
+    tree.invalidate()
+    monkeypatch.setattr(crud.theme, "query_tree", lambda db: ROWS[:2])
+    assert list(tree.get(None)) == [1, 4]
+
+
+def test_theme_tree_expires(monkeypatch):
+    monkeypatch.setattr(crud.theme, "query_tree", lambda db: ROWS[:1])
+    tree = ThemeTree(reload_interval=60)
+    registries.remove(tree)
+    assert list(tree.get(None)) == [1]
+    # written outside of the app
+    monkeypatch.setattr(crud.theme, "query_tree", lambda db: ROWS[:2])
+    assert list(tree.get(None)) == [1]
+    tree._built_at -= 61
+    assert list(tree.get(None)) == [1, 4]
@@ -0,0 +1,64 @@
+from app import crud
+from app.index.base import registries
+from app.index.coordinates import verse_map
+from app.index.text import text_index
+from app.index.versions import VersionInfo, VersionRegistry
+
+KJV = VersionInfo(2, "KJV", "en", 66, "hash", None)
+
+
+def test_registry_reloaded_after_interval(monkeypatch):
+    rows = [KJV]
+    monkeypatch.setattr(crud.bible, "query_versions", lambda db: list(rows))
+    registry = VersionRegistry(reload_interval=60)
+    registries.remove(registry)
+    assert registry.peek("kjv") is None  # not loaded
+    assert registry.get(None, "kjv") == KJV
+    assert registry.peek("KJV") == KJV
+
+    # re-imported by another process, seen once the registry expires
+    rows[0] = KJV._replace(id=5, content_hash="other")
+    assert registry.bible_id(None, "KJV") == 2
+    registry._loaded_at -= 61
+    assert registry.peek("KJV") is None
+    assert registry.bible_id(None, "KJV") == 5
+    assert registry.peek("KJV").content_hash == "other"
+
+
+def test_indexes_dropped_when_content_changes(monkeypatch):
+    lsg = VersionInfo(9001, "LSG", "fr", 66, "hash", None)
+    rows = [KJV._replace(id=9002), lsg]
+    monkeypatch.setattr(crud.bible, "query_versions", lambda db: list(rows))
+    for indexes in (verse_map, text_index):
+        monkeypatch.setattr(indexes, "build", lambda db, bible_id: object())
+    registry = VersionRegistry(reload_interval=60)
+    registries.remove(registry)
+    registry.get(None, "LSG")
+    try:
+        built = {
+            (indexes, bible_id): indexes.get(None, bible_id)
+            for indexes in (verse_map, text_index)
+            for bible_id in (9001, 9002)
+        }
+
+        # updated in place by another process: same id, new content hash
+        rows[1] = lsg._replace(content_hash="other")
+        registry._loaded_at -= 61
+        assert registry.get(None, "LSG").content_hash == "other"
+        for (indexes, bible_id), index in built.items():
+            rebuilt = indexes.get(None, bible_id) is not index
+            assert rebuilt == (bible_id == 9001)
+
+        # deleted by another process
+        rows.pop(0)
+        registry._loaded_at -= 61
+        assert registry.peek("KJV") is None
+        registry.get(None, "LSG")
+        assert all(
+            indexes.get(None, 9002) is not built[indexes, 9002]
+            for indexes in (verse_map, text_index)
+        )
+    finally:
+        for indexes in (verse_map, text_index):
+            indexes.invalidate(9001)
+            indexes.invalidate(9002)